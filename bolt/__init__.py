@@ -1,3 +1,5 @@
-from bolt.factory import array, ones, zeros, concatenate
+from bolt.factory import array, ones, zeros, full, empty, arange, concatenate, \
+    fromnpy, frombinary, fromzarr, load
+from bolt import random
 
 __version__ = '0.7.1'
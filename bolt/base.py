@@ -84,6 +84,12 @@ class BoltArray(object):
         """
         raise NotImplementedError
 
+    def stats(self, axis, stats, keepdims):
+        """
+        Return several statistics of the array elements over the given axis.
+        """
+        raise NotImplementedError
+
     def concatenate(self, arry, axis):
         raise NotImplementedError
 
@@ -15,11 +15,13 @@ def wrapped(f):
     def extract(func):
         append = ""
         args = inspect.getargspec(func)
+        defaults = args.defaults or ()
+        required = len(args.args) - len(defaults)
         for i, a in enumerate(args.args):
-            if i < (len(args) - len(args.defaults)):
+            if i < required:
                 append += str(a) + ", "
             else:
-                default = args.defaults[i-len(args.defaults)]
+                default = defaults[i - required]
                 if hasattr(default, "__name__"):
                     default = default.__name__
                 else:
@@ -29,8 +31,8 @@ def wrapped(f):
         return append
 
     doc = f.__doc__ + "\n"
-    doc += "    local -> array(" + extract(getattr(ConstructLocal, f.__name__)) + "\n"
-    doc += "    spark -> array(" + extract(getattr(ConstructSpark, f.__name__)) + "\n"
+    doc += "    local -> " + f.__name__ + "(" + extract(getattr(ConstructLocal, f.__name__)) + "\n"
+    doc += "    spark -> " + f.__name__ + "(" + extract(getattr(ConstructSpark, f.__name__)) + "\n"
     f.__doc__ = doc
     return f
 
@@ -75,6 +77,55 @@ def zeros(*args, **kwargs):
     """
     return lookup(*args, **kwargs).dispatch('zeros', *args, **kwargs)
 
+@wrapped
+def full(*args, **kwargs):
+    """
+    Create a bolt array filled with a single value.
+    """
+    return lookup(*args, **kwargs).dispatch('full', *args, **kwargs)
+
+@wrapped
+def empty(*args, **kwargs):
+    """
+    Create a bolt array without initializing its values.
+    """
+    return lookup(*args, **kwargs).dispatch('empty', *args, **kwargs)
+
+@wrapped
+def arange(*args, **kwargs):
+    """
+    Create a bolt array of consecutive integers.
+    """
+    return lookup(*args, **kwargs).dispatch('arange', *args, **kwargs)
+
+@wrapped
+def fromnpy(*args, **kwargs):
+    """
+    Load a bolt array from a .npy file.
+    """
+    return lookup(*args, **kwargs).dispatch('fromnpy', *args, **kwargs)
+
+@wrapped
+def frombinary(*args, **kwargs):
+    """
+    Load a bolt array from a flat binary file.
+    """
+    return lookup(*args, **kwargs).dispatch('frombinary', *args, **kwargs)
+
+@wrapped
+def fromzarr(*args, **kwargs):
+    """
+    Load a bolt array from a zarr directory of chunks.
+    """
+    return lookup(*args, **kwargs).dispatch('fromzarr', *args, **kwargs)
+
+@wrapped
+def load(*args, **kwargs):
+    """
+    Load a bolt array saved with save.
+    """
+    return lookup(*args, **kwargs).dispatch('load', *args, **kwargs)
+
 @wrapped
 def concatenate(*args, **kwargs):
     """
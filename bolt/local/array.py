@@ -163,6 +163,42 @@ class BoltArrayLocal(ndarray, BoltArray):
 
         return new_array
 
+    def stats(self, axis=None, stats=('mean', 'std', 'min', 'max'), keepdims=False):
+        """
+        Return several statistics of the array over the given axis.
+
+        Parameters
+        ----------
+        axis : tuple or int, optional, default=None
+            Axis to compute statistics over, if None
+            will compute over all axes
+
+        stats : str or tuple of str, optional, default=('mean', 'std', 'min', 'max')
+            Statistics to compute, any of 'mean', 'var', 'std',
+            'sum', 'min', 'max', and 'count'
+
+        keepdims : boolean, optional, default=False
+            Keep axis remaining after operation with size 1.
+
+        Returns
+        -------
+        dict
+            The value of each statistic, keyed by name
+        """
+        stats = [stats] if isinstance(stats, str) else list(stats)
+        axes = None if axis is None else tupleize(axis)
+
+        result = {}
+        for stat in stats:
+            if stat == 'count':
+                result[stat] = self.size if axes is None else int(prod([self.shape[i] for i in axes]))
+            elif stat in ('mean', 'var', 'std', 'sum', 'min', 'max'):
+                result[stat] = getattr(self, stat)(axis=axes, keepdims=keepdims)
+            else:
+                raise ValueError("Statistic '%s' not understood" % stat)
+
+        return result
+
     def first(self):
         """
         Return first element of the array
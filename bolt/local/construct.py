@@ -1,4 +1,4 @@
-from numpy import float64, asarray
+from numpy import float64, int64, asarray
 
 from bolt.construct import ConstructBase
 from bolt.local.array import BoltArrayLocal
@@ -77,6 +77,218 @@ class ConstructLocal(ConstructBase):
         from numpy import zeros
         return ConstructLocal._wrap(zeros, shape, dtype, order)
 
+    @staticmethod
+    def full(shape, fill_value, dtype=None, order='C'):
+        """
+        Create a local bolt array filled with a single value.
+
+        Parameters
+        ----------
+        shape : tuple
+            Dimensions of the desired array.
+
+        fill_value : scalar
+            The value of every element.
+
+        dtype : data-type, optional, default=None
+            The desired data-type for the array. If None, will
+            be determined from fill_value. (see numpy)
+
+        order : {'C', 'F', 'A'}, optional, default='C'
+            The order of the array. (see numpy)
+
+        Returns
+        -------
+        BoltArrayLocal
+        """
+        from numpy import full
+        return BoltArrayLocal(full(shape, fill_value, dtype, order))
+
+    @staticmethod
+    def empty(shape, dtype=float64, order='C'):
+        """
+        Create a local bolt array without initializing its values.
+
+        Parameters
+        ----------
+        shape : tuple
+            Dimensions of the desired array.
+
+        dtype : data-type, optional, default=float64
+            The desired data-type for the array. (see numpy)
+
+        order : {'C', 'F', 'A'}, optional, default='C'
+            The order of the array. (see numpy)
+
+        Returns
+        -------
+        BoltArrayLocal
+        """
+        from numpy import empty
+        return ConstructLocal._wrap(empty, shape, dtype, order)
+
+    @staticmethod
+    def arange(shape, dtype=int64):
+        """
+        Create a local bolt array of consecutive integers.
+
+        Elements count up from 0 in row-major order, as in
+        numpy.arange(size).reshape(shape).
+
+        Parameters
+        ----------
+        shape : tuple or int
+            Dimensions of the desired array.
+
+        dtype : data-type, optional, default=int64
+            The desired data-type for the array. (see numpy)
+
+        Returns
+        -------
+        BoltArrayLocal
+        """
+        from numpy import arange, prod
+        return BoltArrayLocal(arange(int(prod(shape)), dtype=dtype).reshape(shape))
+
+    @staticmethod
+    def randn(shape, seed=None):
+        """
+        Create a local bolt array of samples from the standard normal distribution.
+
+        Parameters
+        ----------
+        shape : tuple
+            Dimensions of the desired array.
+
+        seed : int, optional, default=None
+            Seed for the random number generator.
+
+        Returns
+        -------
+        BoltArrayLocal
+        """
+        from numpy.random import RandomState
+        return BoltArrayLocal(RandomState(seed).standard_normal(shape))
+
+    @staticmethod
+    def uniform(shape, low=0.0, high=1.0, seed=None):
+        """
+        Create a local bolt array of samples from a uniform distribution.
+
+        Parameters
+        ----------
+        shape : tuple
+            Dimensions of the desired array.
+
+        low : float, optional, default=0.0
+            Lower bound of the samples (inclusive).
+
+        high : float, optional, default=1.0
+            Upper bound of the samples (exclusive).
+
+        seed : int, optional, default=None
+            Seed for the random number generator.
+
+        Returns
+        -------
+        BoltArrayLocal
+        """
+        from numpy.random import RandomState
+        return BoltArrayLocal(RandomState(seed).uniform(low, high, shape))
+
+    @staticmethod
+    def fromnpy(path):
+        """
+        Load a local bolt array from a .npy file.
+
+        Parameters
+        ----------
+        path : str
+            Path to the .npy file.
+
+        Returns
+        -------
+        BoltArrayLocal
+        """
+        from numpy import load
+        return BoltArrayLocal(load(path))
+
+    @staticmethod
+    def frombinary(path, shape, dtype=float64, offset=0, order='C'):
+        """
+        Load a local bolt array from a flat binary file.
+
+        Parameters
+        ----------
+        path : str
+            Path to the binary file.
+
+        shape : tuple
+            The shape of the array stored in the file.
+
+        dtype : data-type, optional, default=float64
+            The data-type of the stored array. (see numpy)
+
+        offset : int, optional, default=0
+            Number of bytes before the start of the array in the file.
+
+        order : {'C', 'F'}, optional, default='C'
+            The order of the stored array. (see numpy)
+
+        Returns
+        -------
+        BoltArrayLocal
+        """
+        from numpy import fromfile, prod
+        count = int(prod(shape))
+        data = fromfile(path, dtype=dtype, count=count, offset=offset)
+        return BoltArrayLocal(data.reshape(shape, order=order))
+
+    @staticmethod
+    def fromzarr(path):
+        """
+        Load a local bolt array from a zarr (v2) directory of chunks.
+
+        Chunks may be uncompressed, or compressed with zlib or gzip.
+
+        Parameters
+        ----------
+        path : str
+            Directory holding the '.zarray' metadata and one file per chunk.
+
+        Returns
+        -------
+        BoltArrayLocal
+        """
+        from bolt.utils import readzarr
+        return BoltArrayLocal(readzarr(path))
+
+    @staticmethod
+    def load(path):
+        """
+        Load a spark bolt array saved with BoltArraySpark.save as a local bolt array.
+
+        Parameters
+        ----------
+        path : str
+            Directory written by save.
+
+        Returns
+        -------
+        BoltArrayLocal
+        """
+        from numpy import empty
+        from bolt.utils import readmeta, readpart
+
+        meta = readmeta(path)
+        shape, split = tuple(meta['shape']), meta['split']
+
+        out = empty(shape, dtype=meta['dtype'])
+        for index, count in enumerate(meta['counts']):
+            keys, values = readpart(path, index, count, shape, split, meta['dtype'])
+            out[tuple(keys.T)] = values
+        return BoltArrayLocal(out)
+
     @staticmethod
     def _wrap(func, shape, dtype, order):
         return BoltArrayLocal(func(shape, dtype, order))
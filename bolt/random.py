@@ -0,0 +1,15 @@
+from bolt.factory import wrapped, lookup
+
+@wrapped
+def randn(*args, **kwargs):
+    """
+    Create a bolt array of samples from the standard normal distribution.
+    """
+    return lookup(*args, **kwargs).dispatch('randn', *args, **kwargs)
+
+@wrapped
+def uniform(*args, **kwargs):
+    """
+    Create a bolt array of samples from a uniform distribution.
+    """
+    return lookup(*args, **kwargs).dispatch('uniform', *args, **kwargs)
@@ -1,12 +1,13 @@
 from __future__ import print_function
-from numpy import asarray, unravel_index, prod, mod, ndarray, ceil, where, \
-    r_, sort, argsort, array, random, arange, ones, expand_dims, sum
-from itertools import groupby
+from numpy import asarray, unravel_index, ravel_multi_index, prod, mod, ndarray, ceil, where, \
+    r_, sort, argsort, array, arange, ones, expand_dims, sum, ufunc, empty, zeros, int64
 
 from bolt.base import BoltArray
-from bolt.spark.stack import StackedArray
-from bolt.spark.utils import zip_with_index
+from bolt.spark.stack import StackedArray, restack, renumber, rowcounts
+from bolt.spark.utils import packing, pack, unpack, probe, infer_result, place, check_placed, \
+    statistics, summarize
 from bolt.spark.statcounter import StatCounter
+from bolt.spark.partitioner import RangePartitioner
 from bolt.utils import slicify, listify, tupleize, argpack, inshape, istransposeable, isreshapeable
 
 
@@ -16,50 +17,312 @@ class BoltArraySpark(BoltArray):
         '_shape': None,
         '_split': None,
         '_dtype': None,
-        '_ordered': True
+        '_ordered': True,
+        '_persisted': None,
+        '_broadcasts': None
     }
 
-    def __init__(self, rdd, shape=None, split=None, dtype=None, ordered=True):
+    _pending = None
+    _inferring = None
+    _partitioner = None
+    _keyranges = None
+    _sizing = None
+    _persisted = None
+    _broadcasts = None
+    _blocked = False
+
+    # records checked in each partition when validating a map by sampling
+    SAMPLED = 10
+
+    def __init__(self, rdd, shape=None, split=None, dtype=None, ordered=True, partitioner=None):
         self._rdd = rdd
         self._shape = shape
         self._split = split
         self._dtype = dtype
         self._mode = 'spark'
         self._ordered = ordered
+        self._partitioner = partitioner
 
     @property
     def _constructor(self):
         return BoltArraySpark
 
+    @property
+    def _rdd(self):
+        """
+        Underlying RDD, with any pending swap and deferred operations applied.
+
+        Deferred operations are fused into a single per-record function
+        and applied with one map, the result replaces the source RDD.
+        Records held in stacks (see _blocks) are first split into records.
+        """
+        if self._pending is not None:
+            self._realize()
+        if self._sizing is not None:
+            self._size()
+        if self._blocked:
+            # iterating over a stack gives views of its rows, without copies
+            self._source = self._source.flatMap(lambda kv: zip(map(tuple, kv[0].tolist()), iter(kv[1])))
+            self._blocked = False
+        if self._deferred:
+            funcs = [(func, keyed) for (_, func, keyed, _) in self._deferred]
+            if any([keyed for (_, keyed) in funcs]):
+                def fused(kv):
+                    for func, keyed in funcs:
+                        kv = func(kv) if keyed else (kv[0], func(kv[1]))
+                    return kv
+                rdd = self._source.map(fused)
+            else:
+                def fused(v):
+                    for func, _ in funcs:
+                        v = func(v)
+                    return v
+                rdd = self._source.mapValues(fused)
+            self._rdd = rdd
+        return self._source
+
+    @_rdd.setter
+    def _rdd(self, rdd):
+        self._source = rdd
+        self._deferred = ()
+        self._keyranges = None
+        self._blocked = False
+
+    @property
+    def _blocks(self):
+        """
+        Underlying RDD of stacks, for arrays whose records are held in stacks.
+
+        The constructors hold small values (see StackedArray.small) in
+        stacks, pairs of a 2-D array of keys and the values stacked along a
+        new first axis, which toarray, reduce, the statistics, filter and
+        basic indexing use directly, without a Python object for each
+        record. Deferred operations are applied to whole stacks if they are
+        vectorized, and otherwise to each row, the result replaces the
+        source RDD.
+        """
+        if self._sizing is not None:
+            self._size()
+        if self._deferred:
+            funcs = [(func, keyed, vectorized) for (_, func, keyed, vectorized) in self._deferred]
+
+            def fused(kv):
+                keys, values = kv
+                for func, keyed, vectorized in funcs:
+                    if vectorized:
+                        values = func(values)
+                    elif keyed:
+                        rows = [func(row) for row in zip(map(tuple, keys.tolist()), iter(values))]
+                        keys = asarray([k for (k, _) in rows], dtype=int64).reshape(len(rows), len(rows[0][0]))
+                        values = restack([v for (_, v) in rows])
+                    else:
+                        values = restack([func(v) for v in values])
+                return keys, values
+
+            self._source = self._source.map(fused)
+            self._deferred = ()
+            self._keyranges = None
+        return self._source
+
+    def _stacked(self):
+        """
+        Stacks of the records, as held if the array is blocked (see _blocks), or made by stack.
+        """
+        if not self._blocked:
+            return self.stack()
+        stk = StackedArray(self._blocks, shape=self.shape, split=self.split, dtype=self.dtype)
+        stk._persisted = self._persisted
+        return stk
+
+    def _first(self):
+        """
+        First record, without splitting stacks into records.
+        """
+        if self._blocked:
+            keys, values = self._blocks.first()
+            return tuple(keys[0].tolist()), values[0]
+        return self._rdd.first()
+
+    @property
+    def _shape(self):
+        if self._sizing is not None:
+            self._size()
+        if self._inferring is not None:
+            self._infer()
+        return self._knownshape
+
+    @_shape.setter
+    def _shape(self, shape):
+        self._knownshape = shape
+
+    @property
+    def _dtype(self):
+        if self._inferring is not None:
+            self._infer()
+        return self._knowndtype
+
+    @_dtype.setter
+    def _dtype(self, dtype):
+        self._knowndtype = dtype
+
+    def _size(self):
+        """
+        Count the records of a lazily sized array (see filter), which
+        is needed before its shape or records can be used.
+        """
+        sizing = self._sizing
+        self._sizing = None
+        sizing(self)
+
+    def _infer(self):
+        """
+        Resolve the shape and dtype of a lazily mapped array,
+        from the first record computed on the executors.
+        """
+        keyshape, value_shape, dtype = self._inferring
+        self._inferring = None
+        if value_shape is None or dtype is None:
+            value = asarray(probe(self._first)[1])
+            if value_shape is None:
+                value_shape = value.shape
+            if dtype is None:
+                dtype = value.dtype
+        self._knownshape = keyshape + tupleize(value_shape)
+        self._knowndtype = dtype
+
+    @property
+    def _ordered(self):
+        """
+        Whether records are sorted by key, which is only
+        known once a pending swap has been performed.
+        """
+        if self._pending is not None:
+            self._realize()
+        return self._isordered
+
+    @_ordered.setter
+    def _ordered(self, ordered):
+        self._isordered = ordered
+
+    def _defer(self, name, func, keyed=False, vectorized=False, **kwargs):
+        """
+        Record an operation on each record without applying it.
+
+        Parameters
+        ----------
+        name : str
+            Description of the operation, see explain
+
+        func : function
+            Function of a value to apply, or of a (key, value)
+            pair returning a (key, value) pair if keyed=True.
+
+        keyed : bool, optional, default=False
+            Whether the function operates on keys as well as values.
+
+        vectorized : bool, optional, default=False
+            Whether the function can be applied to a stack of values at
+            once (e.g. element-wise), see _blocks.
+
+        kwargs : dict
+            Properties of the resulting array (e.g. shape, split, dtype),
+            operations on values alone keep the partitioner by default.
+
+        Returns
+        -------
+        BoltArraySpark
+        """
+        if self._pending is not None:
+            self._realize()
+        if self._sizing is not None:
+            self._size()
+        if self._inferring is not None:
+            self._infer()
+        if not keyed and 'partitioner' not in kwargs:
+            kwargs['partitioner'] = self._partitioner
+        new = self._constructor(self._source, **kwargs).__finalize__(self)
+        new._blocked = self._blocked
+        new._deferred = self._deferred + ((name, func, keyed, vectorized),)
+        return new
+
+    def _sorted(self, rdd=None):
+        """
+        Records sorted by key.
+
+        If the array is range partitioned, each partition is sorted on
+        its own rather than with a shuffle.
+
+        Parameters
+        ----------
+        rdd : RDD, optional, default=None
+            Records to sort, with the same partitions as the array
+            (e.g. filtered), if not the underlying RDD.
+        """
+        if rdd is None:
+            rdd = self._rdd
+        if self._ordered:
+            return rdd
+        if self._partitioner is None:
+            return rdd.sortByKey()
+        return rdd.mapPartitions(lambda it: sorted(it, key=lambda kv: kv[0]), preservesPartitioning=True)
+
+    def explain(self):
+        """
+        Show the operations that will be fused and applied to each record.
+        """
+        print("source%s: %s" % (" (stacks)" if self._blocked else "", self._source))
+        if not self._deferred:
+            print("fused: none")
+        else:
+            names = [name for (name, _, _, _) in self._deferred]
+            kind = "map" if any([keyed for (_, _, keyed, _) in self._deferred]) else "mapValues"
+            print("fused (%s): %s" % (kind, " -> ".join(names)))
+
     def __array__(self):
         return self.toarray()
 
     def cache(self):
         """
-        Cache the underlying RDD in memory.
+        Cache the underlying RDD in memory, after applying
+        any deferred operations.
         """
         self._rdd.cache()
 
     def unpersist(self):
         """
-        Remove the underlying RDD from memory.
+        Remove the underlying RDD from memory, along with the
+        records kept by filter, if this array is the result of one,
+        and the lookups broadcast by advanced indexing.
+
+        Pending swaps, lazy filters and deferred operations are not
+        applied, as their records cannot have been cached yet.
         """
-        self._rdd.unpersist()
+        if self._source is not None:
+            self._source.unpersist()
+        if self._persisted is not None:
+            self._persisted.unpersist()
+        for b in self._broadcasts or ():
+            b.unpersist()
 
     def repartition(self, npartitions):
         """
         Repartitions the underlying RDD
 
+        Records are assigned to partitions by even ranges of their keys,
+        and sorted within each partition, so the result is ordered.
+
         Parameters
         ----------
         npartitions : int
             Number of partitions to repartion the underlying RDD to
         """
+        partitioner = RangePartitioner.uniform(self.keys.shape, npartitions)
+        rdd = self._rdd.repartitionAndSortWithinPartitions(npartitions, partitioner)
+        result = self._constructor(rdd, partitioner=partitioner).__finalize__(self)
+        result._ordered = True
+        return result
 
-        rdd = self._rdd.repartition(npartitions)
-        return self._constructor(rdd, ordered=False).__finalize__(self)
-
-    def stack(self, size=None):
+    def stack(self, size="auto"):
         """
         Aggregates records of a distributed array.
 
@@ -70,16 +333,22 @@ class BoltArraySpark(BoltArray):
 
         Parameters
         ----------
-        size : int, optional, default=None
-            The maximum size for each stack (number of original records),
-            will aggregate groups of records per partition up to this size,
-            if None will aggregate all records on each partition.
+        size : int or str, optional, default="auto"
+            The maximum size for each stack, will aggregate groups of
+            records per partition up to this size. Either a number of
+            original records, or a number of bytes as a string with units
+            (e.g. "64MB"). If "auto", the size is chosen from the memory
+            available to each task (see StackedArray.stacksize), and
+            arrays already held in stacks (see _blocks) keep their stacks.
+            If None, will aggregate all records on each partition.
 
         Returns
         -------
         StackedArray
         """
-        stk = StackedArray(self._rdd, shape=self.shape, split=self.split)
+        if self._blocked and size == "auto":
+            return self._stacked()
+        stk = StackedArray(self._rdd, shape=self.shape, split=self.split, dtype=self.dtype)
         return stk.stack(size)
 
     def _align(self, axis):
@@ -119,10 +388,12 @@ class BoltArraySpark(BoltArray):
         Return the first element of an array
         """
         from bolt.local.array import BoltArrayLocal
-        rdd = self._rdd if self._ordered else self._rdd.sortByKey()
-        return BoltArrayLocal(rdd.values().first())
+        if self._blocked and self._ordered:
+            return BoltArrayLocal(self._first()[1])
+        return BoltArrayLocal(self._sorted().values().first())
 
-    def map(self, func, axis=(0,), value_shape=None, dtype=None, with_keys=False):
+    def map(self, func, axis=(0,), value_shape=None, dtype=None, with_keys=False, infer="driver",
+            validate="full"):
         """
         Apply a function across an axis.
 
@@ -147,50 +418,80 @@ class BoltArraySpark(BoltArray):
         with_keys : bool, optional, default=False
             Include keys as an argument to the function
 
+        infer : str, optional, default="driver"
+            How to infer the shape and dtype if they are not given. If "driver",
+            the function is evaluated on the driver on a random array (or if that
+            fails on the first record, which runs a Spark job), and the result is
+            remembered for the function, input shape and dtype. If "lazy", the
+            function is never evaluated on the driver, and the shape and dtype
+            are taken from the first record computed on the executors,
+            once they are needed: when the shape or dtype is read, or when
+            another operation is applied to the result.
+
+        validate : str, optional, default="full"
+            Which results to check for a uniform shape, as part of applying
+            the function. Either "full" to check every record, "sample" to check
+            only the first records of each partition (see SAMPLED), or "off".
+
         Returns
         -------
         BoltArraySpark
         """
+        if infer not in ("driver", "lazy"):
+            raise ValueError("Inference %s not understood, must be 'driver' or 'lazy'" % infer)
+        if validate not in ("full", "sample", "off"):
+            raise ValueError("Validation %s not understood, must be 'full', 'sample' or 'off'" % validate)
+
         axis = tupleize(axis)
         swapped = self._align(axis)
+        keyshape = tuple([swapped._shape[ax] for ax in range(len(axis))])
 
-        if with_keys:
-            test_func = lambda x: func(((0,), x))
-        else:
-            test_func = func
-
-        if value_shape is None or dtype is None:
-            # try to compute the size of each mapped element by applying func to a random array
-            try:
-                mapped = test_func(random.randn(*swapped.values.shape).astype(self.dtype))
-            except Exception:
-                first = swapped._rdd.first()
-                if first:
-                    # eval func on the first element
-                    mapped = test_func(first[1])
+        if (value_shape is None or dtype is None) and infer == "driver":
+            inferred = infer_result(func, swapped.values.shape, self.dtype,
+                                    swapped._first, with_keys=with_keys)
             if value_shape is None:
-                value_shape = mapped.shape
+                value_shape = inferred[0]
             if dtype is None:
-                dtype = mapped.dtype
+                dtype = inferred[1]
 
-        shape = tuple([swapped._shape[ax] for ax in range(len(axis))]) + tupleize(value_shape)
+        # reshaping will fail if the elements aren't uniformly shaped,
+        # without a known shape values are compared to the first in each task
+        expected = [tupleize(value_shape)] if value_shape is not None else []
+        remaining = [self.SAMPLED if validate == "sample" else -1]
 
-        if with_keys:
-            rdd = swapped._rdd.map(lambda kv: (kv[0], func(kv)))
-        else:
-            rdd = swapped._rdd.mapValues(func)
-
-        # reshaping will fail if the elements aren't uniformly shaped
         def check(v):
-            if len(v.shape) > 0 and v.shape != tupleize(value_shape):
-                raise Exception("Map operation did not produce values of uniform shape.")
+            if len(v.shape) > 0:
+                if not expected:
+                    expected.append(v.shape)
+                elif v.shape != expected[0]:
+                    raise Exception("Map operation did not produce values of uniform shape.")
             return v
 
-        rdd = rdd.mapValues(lambda v: check(v))
+        if validate == "off":
+            apply = func
+        else:
+            def apply(v):
+                if remaining[0] == 0:
+                    return func(v)
+                remaining[0] -= 1
+                return check(func(v))
+
+        if value_shape is None or dtype is None:
+            kwargs = {'split': swapped.split}
+        else:
+            kwargs = {'shape': keyshape + tupleize(value_shape), 'dtype': dtype, 'split': swapped.split}
+
+        if with_keys:
+            kwargs['partitioner'] = swapped._partitioner
+            mapped = swapped._defer('map', lambda kv: (kv[0], apply(kv)), keyed=True, **kwargs)
+        else:
+            mapped = swapped._defer('map', apply, **kwargs)
 
-        return self._constructor(rdd, shape=shape, dtype=dtype, split=swapped.split).__finalize__(swapped)
+        if value_shape is None or dtype is None:
+            mapped._inferring = (keyshape, value_shape, dtype)
+        return mapped
 
-    def filter(self, func, axis=(0,), sort=False):
+    def filter(self, func, axis=(0,), sort=False, lazy=False):
         """
         Filter array along an axis.
 
@@ -199,6 +500,15 @@ class BoltArraySpark(BoltArray):
         aligned so that the desired set of axes are in the keys,
         which may incur a swap.
 
+        The records that pass are counted to reindex (linearize) the keys,
+        and are kept (in memory, or on disk if needed) while counting, so
+        the filter is only evaluated once, except when sorting an array
+        whose records are not ordered and have no known partitioner,
+        where sortByKey evaluates it again to find its ranges. The kept
+        records are passed on to arrays derived from the result, use
+        unpersist on the result, or on any array derived from it, to
+        release them.
+
         Parameters
         ----------
         func : function
@@ -210,35 +520,76 @@ class BoltArraySpark(BoltArray):
         sort: bool, optional, default=False
             Whether or not to sort by key before reindexing
 
+        lazy : bool, optional, default=False
+            Whether to wait until the shape or records of the result
+            are needed before counting the records.
+
         Returns
         -------
         BoltArraySpark
         """
+        from pyspark import StorageLevel
+
         axis = tupleize(axis)
 
         swapped = self._align(axis)
-        def f(record):
-            return func(record[1])
-        rdd = swapped._rdd.filter(f)
-        if sort:
-            rdd = rdd.sortByKey().values()
+
+        # stacks are filtered as a StackedArray, unless they need sorting
+        blocked = swapped._blocked and (not sort or swapped._ordered)
+        if blocked:
+            rdd = swapped._stacked()._selected(lambda values: [bool(func(v)) for v in values])
         else:
-            rdd = rdd.values()
+            def f(record):
+                return func(record[1])
+            rdd = swapped._rdd.filter(f)
+            if sort:
+                rdd = swapped._sorted(rdd).values()
+            else:
+                rdd = rdd.values()
+            rdd = rdd.persist(StorageLevel.MEMORY_AND_DISK)
 
-        # count the resulting array in order to reindex (linearize) the keys
-        count, zipped = zip_with_index(rdd)
-        if not count:
-            count = zipped.count()
-        reindexed = zipped.map(lambda kv: (tupleize(kv[1]), kv[0]))
+        # each partition holds a sorted range of the new keys,
+        # starting from the number of records in earlier partitions
+        starts = []
 
-        # since we can only filter over one axis, the remaining shape is always the following
-        remaining = list(swapped.shape[len(axis):])
-        if count != 0:
-            shape = tuple([count] + remaining)
+        if blocked:
+            reindex, counting = renumber(starts), rowcounts
         else:
-            shape = (0,)
+            def reindex(index, records):
+                for i, v in enumerate(records, starts[index]):
+                    yield (i,), v
+
+            def counting(records):
+                count = 0
+                for _ in records:
+                    count += 1
+                return [count]
+
+        reindexed = rdd.mapPartitionsWithIndex(reindex, preservesPartitioning=True)
+
+        # since we can only filter over one axis, the remaining shape is always the following
+        remaining = tuple(swapped.shape[len(axis):])
+
+        def size(result):
+            counts = rdd.mapPartitions(counting).collect()
+            count = 0
+            for c in counts:
+                starts.append(count)
+                count += c
+            if count != 0:
+                result._knownshape = (count,) + remaining
+                result._partitioner = RangePartitioner((count,), starts + [count])
+            else:
+                result._knownshape = (0,)
 
-        return self._constructor(reindexed, shape=shape, split=1).__finalize__(swapped)
+        result = self._constructor(reindexed, split=1).__finalize__(swapped)
+        result._blocked = blocked
+        result._ordered = True
+        result._persisted = rdd
+        result._sizing = size
+        if not lazy:
+            result._size()
+        return result
 
     def reduce(self, func, axis=(0,), keepdims=False):
         """
@@ -247,7 +598,9 @@ class BoltArraySpark(BoltArray):
         Applies a commutative/associative function of two
         arguments cumulatively to all arrays along an axis.
         Array will be aligned so that the desired set of axes
-        are in the keys, which may incur a swap.
+        are in the keys, which may incur a swap. If the function is
+        a NumPy ufunc, axes in the values are instead reduced within
+        each record, so no swap is needed.
 
         Parameters
         ----------
@@ -264,9 +617,31 @@ class BoltArraySpark(BoltArray):
         from bolt.local.array import BoltArrayLocal
         from numpy import ndarray
 
-        axis = tupleize(axis)
-        swapped = self._align(axis)
-        arr = swapped._rdd.values().treeReduce(func, depth=3)
+        axis = tuple(sorted(tupleize(axis)))
+        inshape(self.shape, axis)
+        if self._blocked:
+            return self._stacked().reduce(func, axis, keepdims)
+
+        split = self.split
+        vaxes = tuple([a - split for a in axis if a >= split])
+
+        if vaxes and isinstance(func, ufunc):
+            # reduce the value axes within each record, and only the key axes across records
+            rdd = self._rdd.mapValues(lambda v: func.reduce(v, axis=vaxes))
+            kkeep = [k for k in range(split) if k not in axis]
+            if not kkeep:
+                arr = rdd.values().treeReduce(func, depth=3)
+            else:
+                kshape = tuple([self.shape[k] for k in kkeep])
+                rdd = rdd.map(lambda kv: (tuple([kv[0][k] for k in kkeep]), kv[1]))
+                if len(kkeep) < split:
+                    rdd = rdd.reduceByKey(func)
+                records = sorted(rdd.collect(), key=lambda kv: kv[0])
+                arr = asarray([v for (_, v) in records])
+                arr = arr.reshape(kshape + arr.shape[1:])
+        else:
+            swapped = self._align(axis)
+            arr = swapped._rdd.values().treeReduce(func, depth=3)
 
         if keepdims:
             for i in axis:
@@ -305,33 +680,108 @@ class BoltArraySpark(BoltArray):
         """
         if axis is None:
             axis = list(range(len(self.shape)))
-        axis = tupleize(axis)
+        axis = tuple(sorted(tupleize(axis)))
 
         if func and not name:
             return self.reduce(func, axis, keepdims)
 
         if name and not func:
-            from bolt.local.array import BoltArrayLocal
+            return statistics(self, axis, [name], keepdims)[0]
 
-            swapped = self._align(axis)
+        else:
+            raise ValueError('Must specify either a function or a statistic name.')
+
+    def _counters(self, axis, stats):
+        """
+        Aggregate StatCounters over an axis in a single pass.
+
+        Axes in the values are aggregated within each record, and axes
+        in the keys across records, giving a counter for each key of the
+        remaining key axes. If no axes in the values are aggregated, the
+        array is aligned instead, giving a single counter.
+
+        Parameters
+        ----------
+        axis : tuple
+            Axis to compute statistics over
+
+        stats : str or list of str
+            Named statistics the counters should support, see StatCounter
+
+        Returns
+        -------
+        (list, tuple)
+            Pairs of keys and counters, sorted by key, and the shape of the keys
+        """
+        from functools import reduce
 
-            def reducer(left, right):
-                return left.combine(right)
+        axis = tuple(sorted(axis))
+        inshape(self.shape, axis)
+        if self._blocked:
+            return self._stacked()._counters(axis, stats)
 
+        split = self.split
+        vaxes = [a - split for a in axis if a >= split]
+
+        def reducer(left, right):
+            return left.combine(right)
+
+        if not vaxes:
+            swapped = self._align(axis)
             counter = swapped._rdd.values()\
-                             .mapPartitions(lambda i: [StatCounter(values=i, stats=name)])\
+                             .mapPartitions(lambda i: [StatCounter(values=i, stats=stats)])\
                              .treeReduce(reducer, depth=3)
+            return [((), counter)], ()
 
-            arr = getattr(counter, name)
+        # elements along the value axes are merged as a block of samples
+        rest = [i for i in range(self.ndim - split) if i not in vaxes]
+        order = vaxes + rest
 
-            if keepdims:
-                for i in axis:
-                    arr = expand_dims(arr, axis=i)
+        def partial(v):
+            v = asarray(v)
+            block = v.transpose(order).reshape((-1,) + tuple([v.shape[i] for i in rest]))
+            return StatCounter(stats=stats).mergeblock(block)
 
-            return BoltArrayLocal(arr).toscalar()
+        kkeep = [k for k in range(split) if k not in axis]
+        if not kkeep:
+            counter = self._rdd.values()\
+                          .mapPartitions(lambda i: [reduce(reducer, map(partial, i), StatCounter(stats=stats))])\
+                          .treeReduce(reducer, depth=3)
+            return [((), counter)], ()
 
-        else:
-            raise ValueError('Must specify either a function or a statistic name.')
+        rdd = self._rdd.map(lambda kv: (tuple([kv[0][k] for k in kkeep]), partial(kv[1])))
+        if len(kkeep) < split:
+            rdd = rdd.reduceByKey(reducer)
+        counters = sorted(rdd.collect(), key=lambda kv: kv[0])
+        return counters, tuple([self.shape[k] for k in kkeep])
+
+    def stats(self, axis=None, stats=('mean', 'std', 'min', 'max'), keepdims=False):
+        """
+        Return several statistics of the array over the given axis.
+
+        All statistics are computed together in a single pass,
+        with at most one swap to align the array (none if any of
+        the axes are in the values, see _counters).
+
+        Parameters
+        ----------
+        axis : tuple or int, optional, default=None
+            Axis to compute statistics over, if None
+            will compute over all axes
+
+        stats : str or tuple of str, optional, default=('mean', 'std', 'min', 'max')
+            Statistics to compute, any of 'mean', 'var', 'std',
+            'sum', 'min', 'max', and 'count'
+
+        keepdims : boolean, optional, default=False
+            Keep axis remaining after operation with size 1.
+
+        Returns
+        -------
+        dict
+            The value of each statistic, keyed by name
+        """
+        return summarize(self, axis, stats, keepdims)
 
     def mean(self, axis=None, keepdims=False):
         """
@@ -391,7 +841,7 @@ class BoltArraySpark(BoltArray):
         keepdims : boolean, optional, default=False
             Keep axis remaining after operation with size 1.
         """
-        from operator import add
+        from numpy import add
         return self._stat(axis, func=add, keepdims=keepdims)
 
     def max(self, axis=None, keepdims=False):
@@ -475,7 +925,64 @@ class BoltArraySpark(BoltArray):
         shape = tuple([x + y if i == axis else x
                       for i, (x, y) in enumerate(zip(self.shape, arry.shape))])
 
-        return self._constructor(rdd, shape=shape, ordered=False).__finalize__(self)
+        # along the first axis the keys of the other array follow all of ours,
+        # so the partitions of both arrays remain ranges of the keys in order
+        ordered, partitioner = False, None
+        if axis == 0:
+            ordered = self._ordered and arry._ordered
+            if self._partitioner is not None and arry._partitioner is not None:
+                offset = int(prod(self.keys.shape))
+                bounds = r_[self._partitioner.bounds[:-1], arry._partitioner.bounds + offset]
+                partitioner = RangePartitioner(shape[:self.split], bounds)
+
+        return self._constructor(rdd, shape=shape, ordered=ordered,
+                                 partitioner=partitioner).__finalize__(self)
+
+    def _ranges(self):
+        """
+        Smallest and largest linearized key in each partition, or None if unknown.
+
+        Computed once, and only for cached arrays, since for other arrays
+        finding them would cost as much as the scan they are meant to avoid.
+        """
+        if self._keyranges is None and self._rdd.is_cached:
+            kshape = self.keys.shape
+
+            def extent(it):
+                linear = [ravel_multi_index(k, kshape) for k, _ in it]
+                return [(int(min(linear)), int(max(linear))) if linear else None]
+
+            self._keyranges = self._rdd.mapPartitions(extent).collect()
+        return self._keyranges
+
+    def _prune(self, lower, upper, stacks=False):
+        """
+        Underlying RDD, skipping the partitions that cannot hold any keys
+        between lower and upper (inclusive along each key axis).
+
+        Partitions are found from the partitioner if known, or from the
+        key ranges of a cached array, otherwise none are skipped. Skipped
+        partitions are empty, and do not evaluate any of their records.
+        If stacks, this is the RDD of stacks of an array held in stacks (see _blocks).
+        """
+        kshape = self.keys.shape
+        start = int(ravel_multi_index(tuple(lower), kshape))
+        stop = int(ravel_multi_index(tuple(upper), kshape)) + 1
+
+        rdd = self._blocks if stacks else self._rdd
+        if self._partitioner is not None:
+            keep = self._partitioner.partitions(start, stop)
+        elif not stacks and self._ranges() is not None:
+            keep = [i for i, r in enumerate(self._ranges())
+                    if r is not None and r[0] < stop and r[1] >= start]
+        else:
+            return rdd
+
+        if len(keep) == rdd.getNumPartitions():
+            return rdd
+        keep = set(keep)
+        return rdd.mapPartitionsWithIndex(lambda i, it: it if i in keep else iter([]),
+                                          preservesPartitioning=True)
 
     def _getbasic(self, index):
         """
@@ -496,19 +1003,32 @@ class BoltArraySpark(BoltArray):
             return all(out)
 
         def key_func(key):
-            return tuple([(k - s.start)/s.step for k, s in zip(key, key_slices)])
+            return tuple([(k - s.start)//s.step for k, s in zip(key, key_slices)])
+
+        # smallest and largest selected key along each axis
+        lower = [s.start if s.step > 0 else s.stop + 1 for s in key_slices]
+        upper = [s.stop - 1 if s.step > 0 else s.start for s in key_slices]
+        shape = tuple([int(ceil((s.stop - s.start) / float(s.step))) for s in index])
+        split = self.split
 
-        filtered = self._rdd.filter(lambda kv: key_check(kv[0]))
+        if self._blocked:
+            # the stacks are indexed as a StackedArray, after skipping the partitions
+            # outside of the selection (stop=-1 is passed so that slicify keeps it)
+            stk = StackedArray(self._prune(lower, upper, stacks=True), shape=self.shape,
+                               split=self.split, dtype=self.dtype)
+            sub = stk[tuple([s if s.stop != -1 else slice(s.start, -d - 1, s.step)
+                             for s, d in zip(index, self.shape)])]
+            return sub._rdd, sub.shape, sub.split
+
+        filtered = self._prune(lower, upper).filter(lambda kv: key_check(kv[0]))
 
         if self._split == self.ndim:
             rdd = filtered.map(lambda kv: (key_func(kv[0]), kv[1]))
         else:
             # handle use of use slice.stop = -1 for a special case (see utils.slicify)
-            value_slices = [s if s.stop != -1 else slice(s.start, None, s.step) for s in value_slices]
+            value_slices = tuple([s if s.stop != -1 else slice(s.start, None, s.step) for s in value_slices])
             rdd = filtered.map(lambda kv: (key_func(kv[0]), kv[1][value_slices]))
 
-        shape = tuple([int(ceil((s.stop - s.start) / float(s.step))) for s in index])
-        split = self.split
         return rdd, shape, split
 
     def _getadvanced(self, index):
@@ -528,32 +1048,25 @@ class BoltArraySpark(BoltArray):
         key_tuples = list(zip(*index[0:self.split]))
         value_tuples = list(zip(*index[self.split:]))
 
-        # build dictionary to look up targets in values
-        d = {}
-        for k, g in groupby(zip(value_tuples, key_tuples), lambda x: x[1]):
-            d[k] = map(lambda x: x[0], list(g))
-
-        def key_check(key):
-            return key in key_tuples
-
-        def key_func(key):
-            return unravel_index(key, shape)
-
-        # filter records based on key targets
-        filtered = self._rdd.filter(lambda kv: key_check(kv[0]))
-
-        # subselect and flatten records based on value targets (if they exist)
-        if len(value_tuples) > 0:
-            flattened = filtered.flatMap(lambda kv: [(kv[0], kv[1][i]) for i in d[kv[0]]])
-        else:
-            flattened = filtered
-
-        # reindex
-        indexed = flattened.zipWithIndex()
-        rdd = indexed.map(lambda kkv: (key_func(kkv[1]), kkv[0][1]))
+        # look up the positions in the result, and the targets in values, of each key
+        # (broadcast once, with constant time lookups for each record)
+        targets = {}
+        for j, k in enumerate(key_tuples):
+            targets.setdefault(k, []).append((j, value_tuples[j] if value_tuples else None))
+        targets = self._rdd.context.broadcast(targets)
+
+        def select(kv):
+            found = targets.value.get(kv[0], ())
+            return [(tuple(unravel_index(j, shape)), kv[1] if v is None else kv[1][v])
+                    for j, v in found]
+
+        # filter records based on key targets, keyed by their positions
+        lower = [min(i) for i in index[0:self.split]]
+        upper = [max(i) for i in index[0:self.split]]
+        rdd = self._prune(lower, upper).flatMap(select)
         split = len(shape)
 
-        return rdd, shape, split
+        return rdd, shape, split, (targets,)
 
     def _getmixed(self, index):
         """
@@ -570,17 +1083,29 @@ class BoltArraySpark(BoltArray):
             raise ValueError("When mixing basic and advanced indexing, "
                              "advanced index must be one-dimensional")
 
-        # single advanced index is on a key -- filter and update key
+        # single advanced index is on a key -- select and update keys
+        broadcasts = ()
         if loc < self.split:
-            def newkey(key):
-                newkey = list(key)
-                newkey[loc] = idx.index(key[loc])
-                return tuple(newkey)
-            rdd = self._rdd.filter(lambda kv: kv[0][loc] in idx).map(lambda kv: (newkey(kv[0]), kv[1]))
+            positions = {}
+            for j, i in enumerate(idx):
+                positions.setdefault(i, []).append(j)
+            positions = self._rdd.context.broadcast(positions)
+            broadcasts = (positions,)
+
+            def select(kv):
+                key = list(kv[0])
+                found = positions.value.get(key[loc], ())
+                return [(tuple(key[:loc] + [j] + key[loc+1:]), kv[1]) for j in found]
+
+            lower = [0] * self.split
+            upper = [s - 1 for s in self.keys.shape]
+            lower[loc], upper[loc] = min(idx), max(idx)
+            rdd = self._prune(lower, upper).flatMap(select)
         # single advanced index is on a value -- use NumPy indexing
         else:
             slices = [slice(0, None, None) for _ in self.values.shape]
             slices[loc - self.split] = idx
+            slices = tuple(slices)
             rdd = self._rdd.map(lambda kv: (kv[0], kv[1][slices]))
         newshape = list(self.shape)
         newshape[loc] = len(idx)
@@ -590,16 +1115,135 @@ class BoltArraySpark(BoltArray):
         new_index = index[:]
         new_index[loc] = slice(0, None, None)
         barray = barray[tuple(new_index)]
-        return barray._rdd, barray.shape, barray.split
+        return barray._rdd, barray.shape, barray.split, broadcasts
+
+    def _getgeneral(self, index):
+        """
+        Indexing with several advanced indices amidst basic indices.
+
+        As in NumPy, the advanced indices are broadcast together, and their
+        dimensions replace them if they are next to each other, or
+        otherwise come first. Records are selected in a single pass, looking
+        up advanced indices on keys in a broadcast dict, and applying
+        advanced indices on values within each record.
+        """
+        from numpy import broadcast_arrays
+
+        split = self.split
+        locs = [n for n, i in enumerate(index) if isinstance(i, ndarray)]
+        try:
+            arrays = broadcast_arrays(*[index[n] for n in locs])
+        except ValueError:
+            raise ValueError("shape mismatch: indexing arrays could not be broadcast "
+                             "together with shapes " + ("%s " * len(locs))
+                             % tuple([index[n].shape for n in locs]))
+        bshape = arrays[0].shape
+        adjacent = locs == list(range(locs[0], locs[-1] + 1))
+
+        # handle use of use slice.stop = -1 for a special case (see utils.slicify)
+        index = [i if not isinstance(i, slice) or i.stop != -1 else slice(i.start, None, i.step)
+                 for i in index]
+        sliced = [n for n in range(self.ndim) if n not in locs]
+        ranges = dict([(n, range(self.shape[n])[index[n]]) for n in sliced])
+
+        # order of the axes of the result, with None for the dimensions of the advanced indices
+        if adjacent:
+            order = [n for n in sliced if n < locs[0]] + [None] + [n for n in sliced if n > locs[0]]
+        else:
+            order = [None] + sliced
+
+        klocs = [n for n in locs if n < split]
+        vlocs = [n for n in locs if n >= split]
+        kslices = [n for n in sliced if n < split]
+        flat = dict([(n, a.ravel().tolist()) for n, a in zip(locs, arrays)])
+        lower = [min(flat[n]) if n in flat else min(ranges[n]) for n in range(split)]
+        upper = [max(flat[n]) if n in flat else max(ranges[n]) for n in range(split)]
+
+        def inslices(key):
+            return all([int(key[n]) in ranges[n] for n in kslices])
+
+        broadcasts = ()
+        if klocs:
+            # records are laid out with the advanced dimensions in the keys,
+            # look up their positions, and the targets in values, of each key
+            targets = {}
+            for j, k in enumerate(zip(*[flat[n] for n in klocs])):
+                targets.setdefault(k, []).append((j, [flat[n][j] for n in vlocs]))
+            targets = self._rdd.context.broadcast(targets)
+            broadcasts = (targets,)
+            keyorder = [o for o in order if o is None or o < split]
+            layout = keyorder + [o for o in order if o is not None and o >= split]
+            newsplit = len(bshape) + len(kslices)
+
+            def select(kv):
+                key, value = kv
+                if not inslices(key):
+                    return []
+                out = []
+                for j, found in targets.value.get(tuple([int(key[n]) for n in klocs]), ()):
+                    newkey = []
+                    for o in keyorder:
+                        if o is None:
+                            newkey.extend([int(i) for i in unravel_index(j, bshape)])
+                        else:
+                            newkey.append(ranges[o].index(int(key[o])))
+                    vindex = index[split:]
+                    for n, t in zip(vlocs, found):
+                        vindex[n - split] = t
+                    out.append((tuple(newkey), value[tuple(vindex)]))
+                return out
+        else:
+            # all advanced indices are on values, and are applied within each record,
+            # where NumPy places their dimensions by the same rule
+            vsliced = [n for n in sliced if n >= split]
+            if adjacent:
+                vorder = [n for n in vsliced if n < locs[0]] + [None] + [n for n in vsliced if n > locs[0]]
+            else:
+                vorder = [None] + vsliced
+            layout = kslices + vorder
+            newsplit = split
+            vindex = tuple(index[split:])
+
+            def select(kv):
+                key, value = kv
+                if not inslices(key):
+                    return []
+                return [(tuple([ranges[n].index(int(key[n])) for n in kslices]), value[vindex])]
+
+        rdd = self._prune(lower, upper).flatMap(select)
+
+        # move the axes from how records are laid out into the order of the result
+        def expand(axes):
+            out = []
+            for o in axes:
+                out.extend([('b', i) for i in range(len(bshape))] if o is None else [('s', o)])
+            return out
+        sizes = dict([(('b', i), d) for i, d in enumerate(bshape)] +
+                     [(('s', n), len(ranges[n])) for n in sliced])
+        laid, wanted = expand(layout), expand(order)
+
+        shape = tuple([sizes[d] for d in laid])
+        result = self._constructor(rdd, shape=shape, split=newsplit, ordered=False).__finalize__(self)
+        if broadcasts:
+            result._broadcasts = (self._broadcasts or ()) + broadcasts
+        if laid != wanted:
+            result = result.transpose(*[laid.index(d) for d in wanted])
+        return result
 
     def __getitem__(self, index):
         """
         Get an item from the array through indexing.
 
-        Supports basic indexing with slices and ints, or advanced
-        indexing with lists or ndarrays of integers.
-        Mixing basic and advanced indexing across axes is currently supported
-        only for a single advanced index amidst multiple basic indices.
+        Supports basic indexing with slices and ints, advanced
+        indexing with lists or ndarrays of integers, and boolean masks,
+        which select the same elements as the integer indices of their
+        true elements (an all-False mask selects an empty array). Basic and advanced indices can be mixed,
+        following NumPy's rules for where the dimensions of the
+        advanced indices are placed.
+
+        Advanced indices on keys are looked up in a table broadcast to
+        the executors, which is kept there until unpersist is called on
+        the result, or on an array derived from it.
 
         Parameters
         ----------
@@ -614,6 +1258,20 @@ class BoltArraySpark(BoltArray):
             index = list(index)
         else:
             index = [index]
+
+        # boolean masks are replaced by the indices of their true elements, one per axis
+        expanded = []
+        for idx in index:
+            if isinstance(idx, (list, tuple, ndarray)) and asarray(idx).dtype == bool:
+                mask = asarray(idx)
+                axes = tuple(self.shape[len(expanded):len(expanded) + mask.ndim])
+                if mask.shape != axes:
+                    raise ValueError("Boolean index with shape {} does not match array with "
+                                     "shape {} at axis {}".format(mask.shape, self.shape, len(expanded)))
+                expanded.extend(mask.nonzero())
+            else:
+                expanded.append(idx)
+        index = expanded
         int_locs = where([isinstance(i, int) for i in index])[0]
 
         if len(index) > self.ndim:
@@ -622,6 +1280,17 @@ class BoltArraySpark(BoltArray):
         if not all([isinstance(i, (slice, int, list, tuple, ndarray)) for i in index]):
             raise ValueError("Each index must either be a slice, int, list, set, or ndarray")
 
+        # an empty selection (e.g. from an all-False mask) has the shape
+        # NumPy gives it, found on a view with no memory per element
+        if any([not isinstance(i, (slice, int)) and asarray(i).size == 0 for i in index]):
+            from numpy.lib.stride_tricks import as_strided
+            view = as_strided(zeros(1), shape=self.shape, strides=(0,) * self.ndim)
+            shape = view[tuple([i if isinstance(i, (slice, int)) else asarray(i, dtype=int)
+                                for i in index])].shape
+            rdd = self._rdd.context.emptyRDD()
+            split = max(min(self.split, len(shape)), 1)
+            return self._constructor(rdd, shape=shape, split=split, dtype=self.dtype)
+
         # fill unspecified axes with full slices
         if len(index) < self.ndim:
             index += tuple([slice(0, None, None) for _ in range(self.ndim - len(index))])
@@ -642,6 +1311,9 @@ class BoltArraySpark(BoltArray):
                 index[n] = slc
             else:
                 adjusted = array(idx)
+                if adjusted.size == 0:
+                    raise ValueError("Index {} in dimension {} with shape {} would "
+                                     "produce an empty dimension".format(idx, n, size))
                 inds = where(adjusted<0)
                 adjusted[inds] += size
                 if adjusted.min() < 0 or adjusted.max() > size-1:
@@ -650,16 +1322,22 @@ class BoltArraySpark(BoltArray):
                 index[n] = adjusted
 
         # select basic or advanced indexing
-        if all([isinstance(i, slice) for i in index]):
+        advanced = [i for i in index if isinstance(i, ndarray)]
+        blocked = False
+        broadcasts = ()
+        if not advanced:
             rdd, shape, split = self._getbasic(index)
-        elif all([isinstance(i, (tuple, list, ndarray)) for i in index]):
-            rdd, shape, split = self._getadvanced(index)
-        elif sum([isinstance(i, (tuple, list, ndarray)) for i in index]) == 1:
-            rdd, shape, split = self._getmixed(index)
+            blocked = self._blocked
+        elif len(advanced) == len(index) and len(set([i.shape for i in advanced])) == 1:
+            rdd, shape, split, broadcasts = self._getadvanced(index)
+        elif len(advanced) == 1 and len(int_locs) == 0:
+            rdd, shape, split, broadcasts = self._getmixed(index)
         else:
-            raise NotImplementedError("When mixing basic indexing (slices and int) with "
-                                      "with advanced indexing (lists, tuples, and ndarrays), "
-                                      "can only have a single advanced index")
+            # ints count as advanced indices here, as in NumPy,
+            # which decides where the dimensions of the advanced indices go
+            for n in int_locs:
+                index[n] = asarray(index[n].start)
+            return self._getgeneral(index)
 
         # if any key indices used negative steps, records are no longer ordered
         if self._ordered is False or any([isinstance(s, slice) and s.step<0 for s in index[:self.split]]):
@@ -667,7 +1345,17 @@ class BoltArraySpark(BoltArray):
         else:
             ordered = True
 
+        # nor if advanced indices select keys out of order
+        advanced = [asarray(i).ravel() for i in index[:self.split] if not isinstance(i, slice)]
+        if advanced:
+            targets = list(zip(*advanced))
+            if any([a > b for a, b in zip(targets[:-1], targets[1:])]):
+                ordered = False
+
         result = self._constructor(rdd, shape=shape, split=split, ordered=ordered).__finalize__(self)
+        result._blocked = blocked
+        if broadcasts:
+            result._broadcasts = (self._broadcasts or ()) + broadcasts
 
         # squeeze out int dimensions (and squeeze to singletons if all ints)
         if len(int_locs) == self.ndim:
@@ -675,7 +1363,7 @@ class BoltArraySpark(BoltArray):
         else:
             return result.squeeze(tuple(int_locs))
 
-    def chunk(self, size="150", axis=None, padding=None):
+    def chunk(self, size="auto", axis=None, padding=None):
         """
         Chunks records of a distributed array.
 
@@ -686,9 +1374,11 @@ class BoltArraySpark(BoltArray):
 
         Parameters
         ----------
-        size : tuple, int, or str, optional, default = "150"
+        size : tuple, int, or str, optional, default = "auto"
             A string giving the size in kilobytes, or a tuple with the size
-            of chunks along each dimension.
+            of chunks along each dimension. If "auto", the size is chosen
+            from the shape and dtype of the array, the number of partitions,
+            and the memory available to each task (see ChunkedArray.autosize).
 
         axis : int or tuple, optional, default = None
             One or more axis to chunk array along, if None
@@ -710,10 +1400,11 @@ class BoltArraySpark(BoltArray):
 
         from bolt.spark.chunk import ChunkedArray
 
-        chnk = ChunkedArray(rdd=self._rdd, shape=self._shape, split=self._split, dtype=self._dtype)
+        chnk = ChunkedArray(rdd=self._rdd, shape=self._shape, split=self._split, dtype=self._dtype,
+                            ordered=self._ordered)
         return chnk._chunk(size, axis, padding)
 
-    def swap(self, kaxes, vaxes, size="150"):
+    def swap(self, kaxes, vaxes, size="auto"):
         """
         Swap axes from keys to values.
 
@@ -723,6 +1414,8 @@ class BoltArraySpark(BoltArray):
         move axes in one direction (from keys to values, or values to keys).
         Keys moved to values will be placed immediately after the split;
         values moved to keys will be placed immediately before the split.
+        The swap is deferred until the records are needed, and composed
+        with any other swaps or transposes that follow.
 
         Parameters
         ----------
@@ -732,10 +1425,11 @@ class BoltArraySpark(BoltArray):
         vaxes : tuple
             Axes from values to move to keys
 
-        size : tuple or int, optional, default = "150"
+        size : tuple, int, or str, optional, default = "auto"
             Can either provide a string giving the size in kilobytes,
             or a tuple with the number of chunks along each
-            value dimension being moved
+            value dimension being moved. If "auto", the size is
+            chosen automatically (see chunk)
 
         Returns
         -------
@@ -753,22 +1447,105 @@ class BoltArraySpark(BoltArray):
         if len(kaxes) == 0 and len(vaxes) == 0:
             return self
 
-        from bolt.spark.chunk import ChunkedArray
+        # keys moved to values go after the split, values moved to keys go before it
+        split = self.split
+        vaxes = vaxes + split
+        stationary_keys = [k for k in range(split) if k not in kaxes]
+        stationary_values = [v for v in range(split, self.ndim) if v not in vaxes]
+        p = r_[stationary_keys, vaxes, kaxes, stationary_values].astype('int')
+
+        return self._swapped(p, split - len(kaxes) + len(vaxes), size)
+
+    def _swapped(self, p, split, size="auto"):
+        """
+        Permute axes and move the split without performing a swap.
+
+        The swap is only performed when the records are needed.
+        Until then, further swaps and transposes are composed with it,
+        so a chain of them costs at most one swap, and none if they cancel.
+
+        Parameters
+        ----------
+        p : ndarray
+            Permutation of the axes
 
-        chunks = self.chunk(size)
+        split : int
+            Axis at which the result is split into keys/values
 
-        swapped = chunks.keys_to_values(kaxes).values_to_keys([v+len(kaxes) for v in vaxes])
-        barray = swapped.unchunk()
+        size : tuple or str, optional, default = "auto"
+            Size of chunks to use for the swap, see swap
 
-        return barray
+        Returns
+        -------
+        BoltArraySpark
+        """
+        if self._pending is not None:
+            source, q, _ = self._pending
+            p = q[p]
+        else:
+            source = self
+
+        if split == source.split and all(p == arange(source.ndim)):
+            return source
+
+        shape = tuple([source.shape[i] for i in p])
+        swapped = self._constructor(None, shape=shape, split=split, dtype=source.dtype)
+        swapped._persisted = source._persisted
+        swapped._broadcasts = source._broadcasts
+        swapped._pending = (source, p, size)
+        return swapped
+
+    def _realize(self):
+        """
+        Perform a pending swap (see _swapped), replacing the records
+        and ordering with those of the swapped array.
+        """
+        source, p, size = self._pending
+        self._pending = None
+        split = self.split
+
+        # the key/value axes that need to be swapped
+        new_keys, new_values = p[:split], p[split:]
+        kaxes = sort(new_values[new_values < source.split])
+        vaxes = sort(new_keys[new_keys >= source.split])
+        stationary_keys = sort(new_keys[new_keys < source.split])
+        stationary_values = sort(new_values[new_values >= source.split])
+
+        if len(kaxes) == 0 and len(vaxes) == 0:
+            arr = source
+        else:
+            from bolt.spark.chunk import ChunkedArray
+            moving = vaxes - source.split
+            if source.split == source.ndim:
+                # no values to chunk
+                chunks = ChunkedArray(source._rdd, shape=source.shape, split=source.split, dtype=source.dtype,
+                                      plan=asarray([], 'int'), padding=asarray([], 'int'), ordered=source._ordered)
+            else:
+                chunks = source.chunk(size, axis=tuple(moving.tolist()))
+            arr = chunks.swap(kaxes, moving)
+
+        # the extra permutation within the keys and values on top of the swap
+        p_swap = r_[stationary_keys, vaxes, kaxes, stationary_values]
+        p_x = argsort(p_swap)[p]
+        p_keys, p_values = p_x[:split], p_x[split:] - split
+
+        if any(p_keys != arange(split)):
+            arr = arr.keys.transpose(tuple(p_keys.tolist()))
+        if any(p_values != arange(len(p_values))):
+            arr = arr.values.transpose(tuple(p_values.tolist()))
+
+        self._rdd = arr._rdd
+        self._ordered = arr._ordered
 
     def transpose(self, *axes):
         """
         Return an array with the axes transposed.
 
         This operation will incur a swap unless the
-        desiured permutation can be obtained
-        only by transpoing the keys or the values.
+        desired permutation can be obtained
+        only by transposing the keys or the values.
+        The swap is deferred, and composed with any
+        other swaps or transposes that follow.
 
         Parameters
         ----------
@@ -782,30 +1559,7 @@ class BoltArraySpark(BoltArray):
 
         istransposeable(p, range(self.ndim))
 
-        split = self.split
-
-        # compute the keys/value axes that need to be swapped
-        new_keys, new_values = p[:split], p[split:]
-        swapping_keys = sort(new_values[new_values < split])
-        swapping_values = sort(new_keys[new_keys >= split])
-        stationary_keys = sort(new_keys[new_keys < split])
-        stationary_values = sort(new_values[new_values >= split])
-
-        # compute the permutation that the swap causes
-        p_swap = r_[stationary_keys, swapping_values, swapping_keys, stationary_values]
-
-        # compute the extra permutation (p_x)  on top of this that
-        # needs to happen to get the full permutation desired
-        p_swap_inv = argsort(p_swap)
-        p_x = p_swap_inv[p]
-        p_keys, p_values = p_x[:split], p_x[split:]-split
-
-        # perform the swap and the the within key/value permutations
-        arr = self.swap(swapping_keys, swapping_values-split)
-        arr = arr.keys.transpose(tuple(p_keys.tolist()))
-        arr = arr.values.transpose(tuple(p_values.tolist()))
-
-        return arr
+        return self._swapped(p, self.split)
 
     @property
     def T(self):
@@ -912,10 +1666,18 @@ class BoltArraySpark(BoltArray):
         else:
             vfunc = lambda v: v
 
-        rdd = self._rdd.map(lambda kv: (kfunc(kv[0]), vfunc(kv[1])))
         shape = tuple([ss for ii, ss in enumerate(self.shape) if ii not in drop])
         split = len([d for d in range(self.keys.ndim) if d not in drop])
-        return self._constructor(rdd, shape=shape, split=split).__finalize__(self)
+        if any(asarray(drop) < self.split):
+            # removing keys of size one keeps their order
+            if self._partitioner is not None and split > 0:
+                partitioner = self._partitioner.reshape(shape[:split])
+            else:
+                partitioner = None
+            return self._defer('squeeze', lambda kv: (kfunc(kv[0]), vfunc(kv[1])), keyed=True,
+                               shape=shape, split=split, partitioner=partitioner)
+        else:
+            return self._defer('squeeze', vfunc, shape=shape, split=split)
 
     def astype(self, dtype, casting='unsafe'):
         """
@@ -926,8 +1688,7 @@ class BoltArraySpark(BoltArray):
         dtype : str or dtype
             Typecode or data-type to cast the array to (see numpy)
         """
-        rdd = self._rdd.mapValues(lambda v: v.astype(dtype, 'K', casting))
-        return self._constructor(rdd, dtype=dtype).__finalize__(self)
+        return self._defer('astype', lambda v: v.astype(dtype, 'K', casting), vectorized=True, dtype=dtype)
 
     def clip(self, min=None, max=None):
         """
@@ -941,8 +1702,7 @@ class BoltArraySpark(BoltArray):
         max : scalar or array-like
             Maximum value. If array, will be broadcasted.
         """
-        rdd = self._rdd.mapValues(lambda v: v.clip(min=min, max=max))
-        return self._constructor(rdd).__finalize__(self)
+        return self._defer('clip', lambda v: v.clip(min=min, max=max), vectorized=True)
 
     @property
     def shape(self):
@@ -1003,15 +1763,169 @@ class BoltArraySpark(BoltArray):
         from bolt.local.array import BoltArrayLocal
         return BoltArrayLocal(self.toarray())
 
-    def toarray(self):
+    def toarray(self, out=None):
         """
         Returns the contents as a local array.
 
-        Will likely cause memory problems for large objects.
+        The output is allocated once and each record is written into
+        its slot by key as partitions arrive, so no sort is needed and
+        only one partition is held on the driver alongside the result.
+        Will likely cause memory problems for large objects, unless
+        writing to a file with `out`.
+
+        Raises a ValueError if the records do not hold each key exactly
+        once, and a TypeError if values would be cast to another kind
+        of dtype (e.g. float to int) to be written.
+
+        Parameters
+        ----------
+        out : str or ndarray, optional, default=None
+            Where to write the result. If a str, a memory-mapped .npy file
+            is created at that path, so arrays larger than the memory of
+            the driver can be collected to disk. If an ndarray, it must
+            have the shape of this array.
+        """
+        if isinstance(out, str):
+            from numpy.lib.format import open_memmap
+            dtype = self.dtype
+            if dtype is None:
+                dtype = asarray(self._rdd.first()[1]).dtype
+            out = open_memmap(out, mode='w+', dtype=dtype, shape=self.shape)
+        elif out is not None and tuple(out.shape) != tuple(self.shape):
+            raise ValueError("out has shape %s but array has shape %s"
+                             % (tuple(out.shape), tuple(self.shape)))
+        elif out is None and self.dtype is not None:
+            out = empty(self.shape, dtype=self.dtype)
+
+        if self._blocked or self._stackable():
+            # small values are collected in stacks, each written into place at once
+            written = zeros(self.shape[:self.split], dtype=bool)
+            count = 0
+            for keys, values in self._stacked().tordd().toLocalIterator():
+                if out is None:
+                    out = empty(self.shape, dtype=values.dtype)
+                place(out, written, tuple(keys.T), values)
+                count += len(keys)
+            check_placed(written, count)
+            if out is None:
+                out = empty(self.shape)
+        else:
+            out = self._fill(out)
+
+        if hasattr(out, 'flush'):
+            out.flush()
+        return out
+
+    def _fill(self, out):
+        """
+        Write each record into an output array by key, allocating it if None.
+        """
+        vshape = self.shape[self.split:]
+        records = self._rdd
+        if packing(records.context, self.dtype):
+            split, dtype = self.split, self.dtype
+            buffers = records.map(lambda kv: pack(kv[0], asarray(kv[1], dtype)))
+            records = (unpack(buf, split, dtype) for buf in buffers.toLocalIterator())
+        else:
+            records = records.toLocalIterator()
+
+        written = zeros(self.shape[:self.split], dtype=bool)
+        count = 0
+        for k, v in records:
+            v = asarray(v)
+            if out is None:
+                out = empty(self.shape, dtype=v.dtype)
+            # index with an ellipsis so that a single element is written
+            # through a view, which keeps object values intact
+            place(out, written, tuple(k), v.reshape(vshape))
+            count += 1
+        check_placed(written, count)
+
+        if out is None:
+            out = empty(self.shape)
+        return out
+
+    def _stackable(self):
+        """
+        Whether records are small enough that moving them in stacks is faster.
+        """
+        return StackedArray.small(self.shape[self.split:], self.dtype)
+
+    def tonpy(self, path):
         """
-        rdd = self._rdd if self._ordered else self._rdd.sortByKey()
-        x = rdd.values().collect()
-        return asarray(x).reshape(self.shape)
+        Write the contents to a .npy file without collecting in memory.
+
+        Records are streamed one partition at a time into a memory-mapped
+        file, see `toarray`.
+
+        Parameters
+        ----------
+        path : str
+            Path of the .npy file to create.
+
+        Returns
+        -------
+        numpy.memmap
+        """
+        return self.toarray(out=path)
+
+    def save(self, path):
+        """
+        Save the array to a directory, to be loaded again with bolt.load.
+
+        Each partition is written by its executor as one raw binary file,
+        holding its values followed by its keys, and a JSON file records
+        the shape, split, dtype, ordering, number of records in each
+        partition and the range of keys in each partition, if known.
+        Loading restores the same partitions, so no shuffle or
+        sort is needed afterwards. The path must be writable from every
+        executor (e.g. on a shared file system).
+
+        Parameters
+        ----------
+        path : str
+            Directory to create.
+        """
+        import json
+        from os import makedirs
+        from os.path import join
+        from numpy import dtype as getdtype, int64, cumsum
+
+        dtype = self.dtype
+        if dtype is None:
+            dtype = asarray(self._rdd.first()[1]).dtype
+        dtype = getdtype(dtype)
+        if dtype.hasobject:
+            raise ValueError("cannot save arrays with dtype %s" % dtype)
+
+        vshape = self.shape[self.split:]
+
+        def write(index, records):
+            keys = []
+            with open(join(path, 'part-%05d' % index), 'wb') as f:
+                for k, v in records:
+                    keys.append(k)
+                    f.write(asarray(v, dtype).reshape(vshape).tobytes())
+                f.write(asarray(keys, dtype=int64).tobytes())
+            yield len(keys)
+
+        makedirs(path)
+        counts = self._rdd.mapPartitionsWithIndex(write).collect()
+
+        # every key is present, so sorted partitions hold ranges of as many keys
+        if self._partitioner is not None:
+            bounds = self._partitioner.bounds.tolist()
+        elif self._ordered:
+            bounds = r_[0, cumsum(counts)].astype(int).tolist()
+        else:
+            bounds = None
+
+        # written last, so that only complete saves can be loaded
+        meta = {'shape': [int(s) for s in self.shape], 'split': int(self.split),
+                'dtype': dtype.str, 'ordered': bool(self._ordered), 'counts': counts,
+                'bounds': bounds}
+        with open(join(path, 'bolt.json'), 'w') as f:
+            json.dump(meta, f)
 
     def tordd(self):
         """
@@ -1,11 +1,12 @@
 from numpy import zeros, ones, asarray, r_, concatenate, arange, ceil, prod, \
     empty, mod, floor, any, ndarray, amin, amax, array_equal, squeeze, array, \
-    where, random, ravel_multi_index
+    where, ravel_multi_index
 
 from itertools import product
 
 from bolt.utils import tuplesort, tupleize, allstack, iterexpand
 from bolt.spark.array import BoltArraySpark
+from bolt.spark.utils import packing, pack, unpack, probe, infer_result
 
 
 class ChunkedArray(object):
@@ -84,7 +85,7 @@ class ChunkedArray(object):
                 object.__setattr__(self, name, other_attr)
         return self
 
-    def _chunk(self, size="150", axis=None, padding=None):
+    def _chunk(self, size="auto", axis=None, padding=None):
         """
         Split values of distributed array into chunks.
 
@@ -97,7 +98,8 @@ class ChunkedArray(object):
         Parameters
         ----------
         size : str or tuple or int
-            If str, the average size (in KB) of the chunks in all value dimensions.
+            If str, the average size (in KB) of the chunks in all value dimensions,
+            or "auto" to choose one from the array and cluster (see autosize).
             If int or tuple, an explicit specification of the number chunks in
             each value dimension.
 
@@ -299,8 +301,11 @@ class ChunkedArray(object):
         newshape = tuple(r_[self.kshape, self.vshape[vmask], self.vshape[~vmask]].astype(int).tolist())
         newpadding = self.padding[~vmask]
 
+        # records stay sorted only if the moving axes are not chunked
+        ordered = self._ordered and array_equal(self.plan[vmask], self.vshape[vmask])
+
         result = self._constructor(None, shape=newshape, split=newsplit,
-                                   dtype=self.dtype, plan=newplan, padding=newpadding, ordered=self._ordered)
+                                   dtype=self.dtype, plan=newplan, padding=newpadding, ordered=ordered)
 
         # remove padding
         if self.padded:
@@ -346,7 +351,120 @@ class ChunkedArray(object):
 
         return result
 
-    def map(self, func, value_shape=None, dtype=None):
+    def swap(self, kaxes, vaxes):
+        """
+        Move axes between keys and values with a single shuffle.
+
+        Each chunk is sent directly to the record that will hold it after
+        the swap, where it is written into a preallocated array. Only the
+        value axes being moved may be chunked, and there can be no padding.
+        Keys moved to values will be placed immediately after the split;
+        values moved to keys will be placed immediately before the split.
+
+        Parameters
+        ----------
+        kaxes : tuple
+            Axes from keys to move to values
+
+        vaxes : tuple
+            Axes from values to move to keys
+
+        Returns
+        -------
+        BoltArraySpark
+        """
+        kaxes = asarray(tupleize(kaxes), 'int')
+        vaxes = asarray(tupleize(vaxes), 'int')
+        kmask, vmask = self.kmask(kaxes), self.vmask(vaxes)
+        plan, vshape, kshape = asarray(self.plan, 'int'), self.vshape, self.kshape
+
+        if any(plan[~vmask] != vshape[~vmask]):
+            raise ValueError("Only the value axes being moved can be chunked")
+        if self.padded:
+            raise ValueError("Cannot swap a padded chunked array")
+
+        split = self.split
+        movingplan = plan[vmask]
+        movingvshape = vshape[vmask]
+        nchunks = self.getnumber(movingplan, movingvshape)
+        perm = r_[where(vmask)[0], where(~vmask)[0]].astype('int')
+
+        newshape = tuple(r_[kshape[~kmask], movingvshape, kshape[kmask], vshape[~vmask]].astype(int).tolist())
+        newsplit = split - len(kaxes) + len(vaxes)
+
+        # records come out sorted if the chunks of the moved value axes
+        # tile them in row-major order
+        chunked = where(movingplan != 1)[0]
+        lexical = len(chunked) == 0 or all(movingplan[chunked[0]+1:] == movingvshape[chunked[0]+1:])
+
+        def _split(k, chk, data):
+            offsets = [c * p for (c, p) in zip(chk, movingplan)]
+            for b in product(*[range(x) for x in data.shape[:len(offsets)]]):
+                yield k + tuple(int(o + i) for (o, i) in zip(offsets, b)), data[b]
+
+        if len(kaxes) == 0:
+            # each record only contributes to its own new records, no shuffle needed
+            def _extract(record):
+                keys, data = record
+                chk = tuple(asarray(keys[split:])[vmask])
+                return _split(tuple(keys[:split]), chk, data.transpose(perm))
+
+            rdd = self._rdd.flatMap(_extract)
+            ordered = self._ordered and lexical
+
+        else:
+            # label each chunk with its group of new records and its place in them
+            def _relabel(record):
+                keys, data = record
+                k, chk = asarray(keys[:split], 'int'), asarray(keys[split:], 'int')
+                group = tuple(k[~kmask].tolist()) + tuple(chk[vmask].tolist())
+                return group, (tuple(k[kmask].tolist()), data.transpose(perm))
+
+            ranges = tuple(kshape[~kmask]) + tuple(nchunks)
+            ngroups = int(prod(ranges))
+            npartitions = min(ngroups, self._rdd.getNumPartitions())
+
+            # contiguous ranges of groups per partition preserve their order
+            def _partitioner(group):
+                return ravel_multi_index(group, ranges) * npartitions // ngroups
+
+            nstationary = int(sum(~kmask))
+            movingkshape = tuple(kshape[kmask].astype(int).tolist())
+            nlabel, nmoving = len(kaxes), len(nchunks)
+            stationaryvshape = tuple(vshape[~vmask].astype(int).tolist())
+            dtype = self.dtype
+
+            rdd = self._rdd.map(_relabel)
+            packed = packing(self._rdd.context, dtype)
+            if packed:
+                # send the label and the extent of the chunk with its raw contents
+                rdd = rdd.mapValues(lambda v: pack(v[0] + v[1].shape[:nmoving], asarray(v[1], dtype)))
+            rdd = rdd.partitionBy(npartitions, _partitioner)
+
+            def _unpack(buf):
+                header, data = unpack(buf, nlabel + nmoving, dtype)
+                return header[:nlabel], data.reshape(header[nlabel:] + stationaryvshape)
+
+            def _assemble(it):
+                buffers = {}
+                for group, value in it:
+                    label, data = _unpack(value) if packed else value
+                    if group not in buffers:
+                        shape = data.shape[:len(nchunks)] + movingkshape + data.shape[len(nchunks):]
+                        buffers[group] = empty(shape, dtype=data.dtype)
+                    index = (slice(None),) * len(nchunks) + label
+                    buffers[group][index] = data
+                for group in sorted(buffers):
+                    k, chk = group[:nstationary], group[nstationary:]
+                    for record in _split(k, chk, buffers.pop(group)):
+                        yield record
+
+            rdd = rdd.mapPartitions(_assemble)
+            ordered = lexical
+
+        return BoltArraySpark(rdd, shape=newshape, split=newsplit, dtype=self.dtype, ordered=ordered)
+
+    def map(self, func, value_shape=None, dtype=None, infer="driver"):
         """
         Apply an array -> array function on each subarray.
 
@@ -364,24 +482,30 @@ class ChunkedArray(object):
         dtype: numpy.dtype, optional, default=None
             Known dtype of values resulting from operation
 
+        infer : str, optional, default="driver"
+            How to infer the shape and dtype if they are not given. If "driver",
+            the function is evaluated on the driver on a random subarray (or if that
+            fails on the first record), and the result is remembered. If "lazy", the
+            function is never evaluated on the driver, and the shape and dtype are
+            taken from the first record computed on the executors.
+
         Returns
         -------
         ChunkedArray
         """
+        if infer not in ("driver", "lazy"):
+            raise ValueError("Inference %s not understood, must be 'driver' or 'lazy'" % infer)
 
         if value_shape is None or dtype is None:
-            # try to compute the size of each mapped element by applying func to a random array
-            try:
-                mapped = func(random.randn(*self.plan).astype(self.dtype))
-            except Exception:
-                first = self._rdd.first()
-                if first:
-                    # eval func on the first element
-                    mapped = func(first[1])
+            if infer == "driver":
+                inferred = infer_result(func, self.plan, self.dtype, lambda: self._rdd.first())
+            else:
+                mapped = asarray(probe(lambda: self._rdd.mapValues(func).first())[1])
+                inferred = mapped.shape, mapped.dtype
             if value_shape is None:
-                value_shape = mapped.shape
+                value_shape = inferred[0]
             if dtype is None:
-                dtype = mapped.dtype
+                dtype = inferred[1]
 
         chunked_dims = where(self.plan != self.vshape)[0]
         unchunked_dims = where(self.plan == self.vshape)[0]
@@ -431,7 +555,43 @@ class ChunkedArray(object):
         newsplit = len(self.shape)
         return BoltArraySpark(rdd, shape=newshape, split=newsplit, ordered=self._ordered, dtype="object")
 
-    def getplan(self, size="150", axes=None, padding=None):
+    def autosize(self, memory=None):
+        """
+        Choose an average size (in KB) for chunks of this array.
+
+        Aims for several chunks per task given the number of partitions
+        and the default parallelism of the cluster, without going below
+        150 KB (small chunks have a large per-record overhead), or above
+        a sixteenth of the memory available to each task. If that memory
+        is below 2.4 MB the memory limit wins, so chunks can be smaller
+        than 150 KB.
+
+        Parameters
+        ----------
+        memory : int or str, optional, default=None
+            Memory budget for a single task, in bytes or as a string with
+            units (e.g. "512m"). If None, uses the Spark configuration
+            'bolt.task.memory' if set, otherwise 'spark.executor.memory'
+            divided by 'spark.executor.cores'.
+
+        Returns
+        -------
+        str
+        """
+        from numpy import dtype as gettype
+        from bolt.spark.utils import task_memory
+
+        context = self._rdd.context
+        memory = task_memory(context, memory)
+
+        nbytes = 1.0 * prod(self.shape) * gettype(self.dtype).itemsize
+        tasks = max(self._rdd.getNumPartitions(), context.defaultParallelism)
+
+        # a task holds many chunks at once, e.g. while assembling them in a swap
+        size = min(max(nbytes / (4 * tasks), 150000.0), memory / 16.0)
+        return str(size / 1000.0)
+
+    def getplan(self, size="auto", axes=None, padding=None):
         """
         Identify a plan for chunking values along each dimension.
 
@@ -442,7 +602,8 @@ class ChunkedArray(object):
         Parameters
         ----------
         size : string or tuple
-             If str, the average size (in KB) of the chunks in all value dimensions.
+             If str, the average size (in KB) of the chunks in all value dimensions,
+             or "auto" to choose one from the array and cluster (see autosize).
              If int/tuple, an explicit specification of the number chunks in
              each moving value dimension.
 
@@ -457,6 +618,9 @@ class ChunkedArray(object):
         """
         from numpy import dtype as gettype
 
+        if size == "auto":
+            size = self.autosize()
+
         # initialize with all elements in one chunk
         plan = self.vshape
 
@@ -501,7 +665,7 @@ class ChunkedArray(object):
                         continue
                     else:
                         s.append(min(d, floor(size/minsize)))
-                        s[i+1:] = plan[i+1:]
+                        s[i+1:] = dims[i+1:]
                         break
 
             plan[axes] = s
@@ -547,7 +711,7 @@ class ChunkedArray(object):
         stops = [None if (i == n-1 or not m) else -p for (i, m, p, n) in zip(idx, mask, padding, number)]
         slices = [slice(i1, i2) for (i1, i2) in zip(starts, stops)]
 
-        return value[slices]
+        return value[tuple(slices)]
 
     @staticmethod
     def getnumber(plan, shape):
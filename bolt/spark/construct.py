@@ -1,9 +1,9 @@
-from numpy import unravel_index, prod, arange, asarray, float64
-
-from itertools import product
+from numpy import unravel_index, prod, arange, array, asarray, ascontiguousarray, empty, float64, int64
 
 from bolt.construct import ConstructBase
 from bolt.spark.array import BoltArraySpark
+from bolt.spark.partitioner import RangePartitioner
+from bolt.spark.stack import StackedArray, stackrows, blocks
 from bolt.spark.utils import get_kv_shape, get_kv_axes
 
 
@@ -63,11 +63,34 @@ class ConstructSpark(ConstructBase):
         key_shape = shape[:split]
         val_shape = shape[split:]
 
-        keys = zip(*unravel_index(arange(0, int(prod(key_shape))), key_shape))
-        vals = arry.reshape((prod(key_shape),) + val_shape)
-
-        rdd = context.parallelize(zip(keys, vals), npartitions)
-        return BoltArraySpark(rdd, shape=shape, split=split, dtype=dtype)
+        n = int(prod(key_shape))
+        vals = arry.reshape((n,) + val_shape)
+
+        # ship one contiguous block of records per partition, rather than
+        # pickling each record on the driver, and expand keys on the executors
+        if npartitions is None:
+            npartitions = context.defaultParallelism
+        npartitions = max(min(npartitions, n), 1)
+        bounds = [(n * i) // npartitions for i in range(npartitions + 1)]
+        shipped = [(bounds[i], ascontiguousarray(vals[bounds[i]:bounds[i+1]]))
+                   for i in range(npartitions)]
+
+        # small values are held in stacks of records (see StackedArray.small)
+        stacked = StackedArray.small(val_shape, dtype)
+        rows = stackrows(context, val_shape, dtype) if stacked else None
+
+        def expand(block):
+            start, vals = block
+            keys = unravel_index(arange(start, start + len(vals)), key_shape)
+            if stacked:
+                return blocks(asarray(keys, dtype=int64).T, vals, rows)
+            return zip(zip(*keys), vals)
+
+        rdd = context.parallelize(shipped, npartitions).flatMap(expand)
+        partitioner = RangePartitioner(key_shape, bounds)
+        arr = BoltArraySpark(rdd, shape=shape, split=split, dtype=dtype, partitioner=partitioner)
+        arr._blocked = stacked
+        return arr
 
     @staticmethod
     def ones(shape, context=None, axis=(0,), dtype=float64, npartitions=None):
@@ -133,6 +156,363 @@ class ConstructSpark(ConstructBase):
         from numpy import zeros
         return ConstructSpark._wrap(zeros, shape, context, axis, dtype, npartitions)
 
+    @staticmethod
+    def full(shape, fill_value, context=None, axis=(0,), dtype=None, npartitions=None):
+        """
+        Create a spark bolt array filled with a single value.
+
+        Parameters
+        ----------
+        shape : tuple
+            The desired shape of the array.
+
+        fill_value : scalar
+            The value of every element.
+
+        context : SparkContext
+            A context running Spark. (see pyspark)
+
+        axis : tuple, optional, default=(0,)
+            Which axes to distribute the array along. The resulting
+            distributed object will use keys to represent these axes,
+            with the remaining axes represented by values.
+
+        dtype : data-type, optional, default=None
+            The desired data-type for the array. If None, will
+            be determined from fill_value. (see numpy)
+
+        npartitions : int
+            Number of partitions for parallization.
+
+        Returns
+        -------
+        BoltArraySpark
+        """
+        from numpy import full
+        if dtype is None:
+            dtype = asarray(fill_value).dtype
+        func = lambda shape, dtype, order: full(shape, fill_value, dtype, order)
+        return ConstructSpark._wrap(func, shape, context, axis, dtype, npartitions)
+
+    @staticmethod
+    def empty(shape, context=None, axis=(0,), dtype=float64, npartitions=None):
+        """
+        Create a spark bolt array without initializing its values.
+
+        Parameters
+        ----------
+        shape : tuple
+            The desired shape of the array.
+
+        context : SparkContext
+            A context running Spark. (see pyspark)
+
+        axis : tuple, optional, default=(0,)
+            Which axes to distribute the array along. The resulting
+            distributed object will use keys to represent these axes,
+            with the remaining axes represented by values.
+
+        dtype : data-type, optional, default=float64
+            The desired data-type for the array. (see numpy)
+
+        npartitions : int
+            Number of partitions for parallization.
+
+        Returns
+        -------
+        BoltArraySpark
+        """
+        from numpy import empty
+        return ConstructSpark._wrap(empty, shape, context, axis, dtype, npartitions)
+
+    @staticmethod
+    def arange(shape, context=None, axis=(0,), dtype=int64, npartitions=None):
+        """
+        Create a spark bolt array of consecutive integers.
+
+        Elements count up from 0 in row-major order, as in
+        numpy.arange(size).reshape(shape).
+
+        Parameters
+        ----------
+        shape : tuple or int
+            The desired shape of the array.
+
+        context : SparkContext
+            A context running Spark. (see pyspark)
+
+        axis : tuple, optional, default=(0,)
+            Which axes to distribute the array along. The resulting
+            distributed object will use keys to represent these axes,
+            with the remaining axes represented by values.
+
+        dtype : data-type, optional, default=int64
+            The desired data-type for the array. (see numpy)
+
+        npartitions : int
+            Number of partitions for parallization.
+
+        Returns
+        -------
+        BoltArraySpark
+        """
+        def make(index, start, stop, value_shape):
+            size = int(prod(value_shape))
+            values = arange(start * size, stop * size, dtype=dtype)
+            return values.reshape((stop - start,) + tuple(value_shape))
+
+        return ConstructSpark._generate(make, shape, context, axis, dtype, npartitions)
+
+    @staticmethod
+    def randn(shape, context=None, axis=(0,), seed=None, npartitions=None):
+        """
+        Create a spark bolt array of samples from the standard normal distribution.
+
+        Each partition draws from its own random stream, seeded from
+        the seed and the partition index, so the same seed and number
+        of partitions always give the same array, including when
+        partitions are recomputed.
+
+        Parameters
+        ----------
+        shape : tuple
+            The desired shape of the array.
+
+        context : SparkContext
+            A context running Spark. (see pyspark)
+
+        axis : tuple, optional, default=(0,)
+            Which axes to distribute the array along. The resulting
+            distributed object will use keys to represent these axes,
+            with the remaining axes represented by values.
+
+        seed : int, optional, default=None
+            Seed for the random streams. If None, one is chosen at random.
+
+        npartitions : int
+            Number of partitions for parallization.
+
+        Returns
+        -------
+        BoltArraySpark
+        """
+        seed = ConstructSpark._seed(seed)
+
+        def make(index, start, stop, value_shape):
+            from numpy.random import RandomState
+            return RandomState([seed, index]).standard_normal((stop - start,) + tuple(value_shape))
+
+        return ConstructSpark._generate(make, shape, context, axis, float64, npartitions)
+
+    @staticmethod
+    def uniform(shape, context=None, axis=(0,), low=0.0, high=1.0, seed=None, npartitions=None):
+        """
+        Create a spark bolt array of samples from a uniform distribution.
+
+        Each partition draws from its own random stream, as for randn.
+
+        Parameters
+        ----------
+        shape : tuple
+            The desired shape of the array.
+
+        context : SparkContext
+            A context running Spark. (see pyspark)
+
+        axis : tuple, optional, default=(0,)
+            Which axes to distribute the array along. The resulting
+            distributed object will use keys to represent these axes,
+            with the remaining axes represented by values.
+
+        low : float, optional, default=0.0
+            Lower bound of the samples (inclusive).
+
+        high : float, optional, default=1.0
+            Upper bound of the samples (exclusive).
+
+        seed : int, optional, default=None
+            Seed for the random streams. If None, one is chosen at random.
+
+        npartitions : int
+            Number of partitions for parallization.
+
+        Returns
+        -------
+        BoltArraySpark
+        """
+        seed = ConstructSpark._seed(seed)
+
+        def make(index, start, stop, value_shape):
+            from numpy.random import RandomState
+            return RandomState([seed, index]).uniform(low, high, (stop - start,) + tuple(value_shape))
+
+        return ConstructSpark._generate(make, shape, context, axis, float64, npartitions)
+
+    @staticmethod
+    def fromnpy(path, context=None, axis=(0,), npartitions=None):
+        """
+        Load a spark bolt array from a .npy file.
+
+        The shape and dtype are read from the header on the driver, and
+        each partition reads its own records from a memory map of the
+        file, so the path must be readable from every executor (e.g. on
+        a shared file system).
+
+        Parameters
+        ----------
+        path : str
+            Path to the .npy file.
+
+        context : SparkContext
+            A context running Spark. (see pyspark)
+
+        axis : tuple, optional, default=(0,)
+            Which axes to distribute the array along. These axes are
+            represented by keys, and come first in the resulting array.
+
+        npartitions : int
+            Number of partitions for parallization.
+
+        Returns
+        -------
+        BoltArraySpark
+        """
+        from numpy import load
+        header = load(path, mmap_mode='r')
+        shape, dtype = header.shape, header.dtype
+        del header
+
+        def read(region):
+            return array(load(path, mmap_mode='r')[region])
+
+        return ConstructSpark._load(read, shape, context, axis, dtype, npartitions)
+
+    @staticmethod
+    def frombinary(path, shape, context=None, axis=(0,), dtype=float64, offset=0, order='C', npartitions=None):
+        """
+        Load a spark bolt array from a flat binary file.
+
+        Each partition reads its own records from a memory map of the
+        file, so the path must be readable from every executor (e.g. on
+        a shared file system).
+
+        Parameters
+        ----------
+        path : str
+            Path to the binary file.
+
+        shape : tuple
+            The shape of the array stored in the file.
+
+        context : SparkContext
+            A context running Spark. (see pyspark)
+
+        axis : tuple, optional, default=(0,)
+            Which axes to distribute the array along. These axes are
+            represented by keys, and come first in the resulting array.
+
+        dtype : data-type, optional, default=float64
+            The data-type of the stored array. (see numpy)
+
+        offset : int, optional, default=0
+            Number of bytes before the start of the array in the file.
+
+        order : {'C', 'F'}, optional, default='C'
+            The order of the stored array. (see numpy)
+
+        npartitions : int
+            Number of partitions for parallization.
+
+        Returns
+        -------
+        BoltArraySpark
+        """
+        from numpy import memmap, dtype as getdtype
+        shape = (shape,) if isinstance(shape, int) else tuple(shape)
+        dtype = getdtype(dtype)
+
+        def read(region):
+            data = memmap(path, dtype=dtype, mode='r', offset=offset, shape=shape, order=order)
+            return array(data[region])
+
+        return ConstructSpark._load(read, shape, context, axis, dtype, npartitions)
+
+    @staticmethod
+    def fromzarr(path, context=None, axis=(0,), npartitions=None):
+        """
+        Load a spark bolt array from a zarr (v2) directory of chunks.
+
+        The shape, dtype and chunking are read from the metadata on the
+        driver, and each partition reads only the chunks that overlap
+        its own records. Chunks may be uncompressed, or compressed with
+        zlib or gzip. The path must be readable from every executor
+        (e.g. on a shared file system).
+
+        Parameters
+        ----------
+        path : str
+            Directory holding the '.zarray' metadata and one file per chunk.
+
+        context : SparkContext
+            A context running Spark. (see pyspark)
+
+        axis : tuple, optional, default=(0,)
+            Which axes to distribute the array along. These axes are
+            represented by keys, and come first in the resulting array.
+
+        npartitions : int
+            Number of partitions for parallization.
+
+        Returns
+        -------
+        BoltArraySpark
+        """
+        from bolt.utils import zarrinfo, readzarr
+        info = zarrinfo(path)
+
+        def read(region):
+            return readzarr(path, region, info)
+
+        return ConstructSpark._load(read, info['shape'], context, axis, info['dtype'], npartitions)
+
+    @staticmethod
+    def load(path, context=None):
+        """
+        Load a spark bolt array saved with BoltArraySpark.save.
+
+        Each partition reads one of the saved files, so the array has
+        the same partitions, and ordering, as when it was saved. The
+        path must be readable from every executor.
+
+        Parameters
+        ----------
+        path : str
+            Directory written by save.
+
+        context : SparkContext
+            A context running Spark. (see pyspark)
+
+        Returns
+        -------
+        BoltArraySpark
+        """
+        from bolt.utils import readmeta, readpart
+        meta = readmeta(path)
+        shape, split, counts = tuple(meta['shape']), meta['split'], meta['counts']
+
+        def read(index, _):
+            if index >= len(counts):
+                return []
+            keys, values = readpart(path, index, counts[index], shape, split, meta['dtype'])
+            return zip(map(tuple, keys.tolist()), values)
+
+        nparts = max(len(counts), 1)
+        rdd = context.parallelize(range(nparts), nparts).mapPartitionsWithIndex(read)
+        bounds = meta.get('bounds', None)
+        partitioner = RangePartitioner(shape[:split], bounds) if bounds is not None else None
+        return BoltArraySpark(rdd, shape=shape, split=split, dtype=meta['dtype'], ordered=meta['ordered'],
+                              partitioner=partitioner)
+
     @staticmethod
     def concatenate(arrays, axis=0):
         """
@@ -209,14 +589,87 @@ class ConstructSpark(ConstructBase):
         """
         Wrap an existing numpy constructor in a parallelized construction
         """
+        def make(index, start, stop, value_shape):
+            return func((stop - start,) + tuple(value_shape), dtype, order='C')
+
+        return ConstructSpark._generate(make, shape, context, axis, dtype, npartitions)
+
+    @staticmethod
+    def _generate(make, shape, context=None, axis=(0,), dtype=None, npartitions=None):
+        """
+        Generate an array on the executors from ranges of its keys.
+
+        The linear range of keys is split evenly across partitions, and
+        each partition expands its own keys, so nothing proportional to
+        the number of keys is built on the driver. The values for a
+        partition are made together by calling make(index, start, stop, value_shape),
+        which should return them stacked along a new first axis, and small
+        values are kept in stacks rather than split into records.
+        """
         if isinstance(shape, int):
             shape = (shape,)
+        shape = tuple(shape)
         key_shape, value_shape = get_kv_shape(shape, ConstructSpark._format_axes(axis, shape))
         split = len(key_shape)
 
-        # make the keys
-        rdd = context.parallelize(list(product(*[arange(x) for x in key_shape])), npartitions)
+        n = int(prod(key_shape))
+        if npartitions is None:
+            npartitions = context.defaultParallelism
+        npartitions = max(min(npartitions, n), 1)
+
+        stacked = StackedArray.small(value_shape, dtype)
+        rows = stackrows(context, value_shape, dtype) if stacked else None
 
-        # use a map to make the arrays in parallel
-        rdd = rdd.map(lambda x: (x, func(value_shape, dtype, order='C')))
-        return BoltArraySpark(rdd, shape=shape, split=split, dtype=dtype)
+        def generate(index, _):
+            start, stop = (n * index) // npartitions, (n * (index + 1)) // npartitions
+            keys = unravel_index(arange(start, stop), key_shape)
+            values = make(index, start, stop, value_shape)
+            if stacked:
+                return blocks(asarray(keys, dtype=int64).T, values, rows)
+            return zip(zip(*keys), values)
+
+        rdd = context.parallelize(range(npartitions), npartitions).mapPartitionsWithIndex(generate)
+        partitioner = RangePartitioner.uniform(key_shape, npartitions)
+        arr = BoltArraySpark(rdd, shape=shape, split=split, dtype=dtype, partitioner=partitioner)
+        arr._blocked = stacked
+        return arr
+
+    @staticmethod
+    def _load(read, shape, context=None, axis=(0,), dtype=None, npartitions=None):
+        """
+        Load an array on the executors from storage that can be read by region.
+
+        Each partition calls read(region), with a tuple of slices in the
+        stored order of the axes, for the smallest region covering its
+        keys, and selects its records from the result. The key axes come
+        first in the resulting array.
+        """
+        axes = ConstructSpark._format_axes(axis, shape)
+        key_axes, value_axes = get_kv_axes(shape, axes)
+        permutation = key_axes + value_axes
+        key_shape = [shape[a] for a in key_axes]
+        split = len(key_axes)
+        transposed = tuple([shape[a] for a in permutation])
+
+        def make(index, start, stop, value_shape):
+            if stop == start:
+                return empty((0,) + tuple(value_shape), dtype=dtype)
+            keys = unravel_index(arange(start, stop), key_shape)
+            box = [slice(k.min(), k.max() + 1) for k in keys]
+            region = [slice(None)] * len(shape)
+            for a, b in zip(key_axes, box):
+                region[a] = b
+            block = read(tuple(region)).transpose(permutation)
+            return block[tuple([k - b.start for k, b in zip(keys, box)])]
+
+        return ConstructSpark._generate(make, transposed, context, tuple(range(split)), dtype, npartitions)
+
+    @staticmethod
+    def _seed(seed):
+        """
+        Choose a seed on the driver if none is given, so recomputed partitions are reproducible
+        """
+        if seed is None:
+            from numpy.random import randint
+            seed = int(randint(0, 2 ** 31 - 1))
+        return seed
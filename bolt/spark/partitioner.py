@@ -0,0 +1,75 @@
+from numpy import asarray, ravel_multi_index, searchsorted, prod, int64, arange
+
+
+class RangePartitioner(object):
+    """
+    Assignment of records to partitions by ranges of their keys.
+
+    Keys are linearized in row-major order over the shape of the keys
+    (see numpy.ravel_multi_index), and partition i holds the records whose
+    linear keys are in the range [bounds[i], bounds[i+1]). Records need not
+    be sorted within a partition, so ordering can be restored by sorting
+    each partition on its own.
+
+    Parameters
+    ----------
+    kshape : tuple
+        Shape of the keys.
+
+    bounds : array-like
+        Start of the range of each partition, followed by the number of keys.
+    """
+    def __init__(self, kshape, bounds):
+        self.kshape = tuple(int(s) for s in kshape)
+        self.bounds = asarray(bounds, dtype=int64)
+
+    @classmethod
+    def uniform(cls, kshape, npartitions):
+        """
+        Split the keys evenly into the given number of partitions.
+        """
+        n = int(prod(kshape))
+        return cls(kshape, (n * arange(npartitions + 1)) // npartitions)
+
+    @property
+    def npartitions(self):
+        return len(self.bounds) - 1
+
+    def __call__(self, key):
+        """
+        Index of the partition holding a key.
+        """
+        return int(searchsorted(self.bounds, self.linearize(key), 'right')) - 1
+
+    def __eq__(self, other):
+        return isinstance(other, RangePartitioner) and self.kshape == other.kshape \
+            and self.bounds.tolist() == other.bounds.tolist()
+
+    def __ne__(self, other):
+        return not self == other
+
+    def __repr__(self):
+        return "RangePartitioner(kshape=%s, bounds=%s)" % (self.kshape, self.bounds.tolist())
+
+    def linearize(self, key):
+        """
+        Position of a key in the row-major order of all keys.
+        """
+        return int(ravel_multi_index(tuple(key), self.kshape))
+
+    def partitions(self, start, stop):
+        """
+        Indices of the partitions holding any linear key in [start, stop).
+        """
+        if stop <= start:
+            return []
+        first = int(searchsorted(self.bounds, start, 'right')) - 1
+        last = int(searchsorted(self.bounds, stop, 'left'))
+        return [i for i in range(max(first, 0), min(last, self.npartitions))
+                if self.bounds[i] < self.bounds[i+1]]
+
+    def reshape(self, kshape):
+        """
+        Same partitions for keys reshaped without changing their order.
+        """
+        return RangePartitioner(kshape, self.bounds)
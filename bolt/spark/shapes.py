@@ -61,7 +61,13 @@ class Keys(Shapes):
         newsplit = len(new)
         newshape = new + self._barray.values.shape
 
-        return BoltArraySpark(newrdd, shape=newshape, split=newsplit).__finalize__(self._barray)
+        # reshaping keeps the order of the keys, and so any ranges of them
+        partitioner = self._barray._partitioner
+        if partitioner is not None:
+            partitioner = partitioner.reshape(new)
+
+        return BoltArraySpark(newrdd, shape=newshape, split=newsplit,
+                              partitioner=partitioner).__finalize__(self._barray)
 
     def transpose(self, *axes):
         """
@@ -128,10 +134,9 @@ class Values(Shapes):
         def f(v):
             return v.reshape(new)
 
-        newrdd = self._barray._rdd.mapValues(f)
         newshape = self._barray.keys.shape + new
 
-        return BoltArraySpark(newrdd, shape=newshape).__finalize__(self._barray)
+        return self._barray._defer('reshape', f, shape=newshape)
 
     def transpose(self, *axes):
         """
@@ -153,10 +158,9 @@ class Values(Shapes):
         def f(v):
             return v.transpose(new)
 
-        newrdd = self._barray._rdd.mapValues(f)
         newshape = self._barray.keys.shape + tuple(self.shape[i] for i in new)
 
-        return BoltArraySpark(newrdd, shape=newshape).__finalize__(self._barray)
+        return self._barray._defer('transpose', f, shape=newshape)
 
     def __str__(self):
         s = "BoltArray Values\n"
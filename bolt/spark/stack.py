@@ -1,28 +1,105 @@
-from numpy import asarray, ndarray, concatenate
-from bolt.spark.utils import zip_with_index
+from numpy import asarray, ndarray, concatenate, ones, empty, zeros, ceil, arange, int64
+from bolt.spark.utils import zip_with_index, parse_size, task_memory, probe, place, check_placed, \
+    statistics, summarize
+from bolt.utils import slicify, tupleize
+
+def _collapse(block, axes):
+    """
+    Move the given axes of a block to the front, and flatten them into one.
+    """
+    rest = [i for i in range(block.ndim) if i not in axes]
+    block = block.transpose(list(axes) + rest)
+    return block.reshape((-1,) + tuple([block.shape[i] for i in range(len(axes), block.ndim)]))
+
+def stackbytes(context, memory=None):
+    """
+    Size (in bytes) for stacks, at most 16 MB and a sixteenth of the memory of a task.
+    """
+    return min(16 * 1024 ** 2, task_memory(context, memory) // 16)
+
+def stackrows(context, value_shape, dtype):
+    """
+    Number of records per stack, for values of this shape and dtype (see stackbytes).
+    """
+    from numpy import prod, dtype as getdtype
+    rowbytes = int(prod(value_shape)) * getdtype(dtype).itemsize
+    return max(stackbytes(context) // max(rowbytes, 1), 1)
+
+def blocks(keys, values, rows):
+    """
+    Split records, with keys as an (n, split) array, into stacks of at most this many rows.
+    """
+    return [(keys[i:i + rows], values[i:i + rows]) for i in range(0, len(keys), rows)]
+
+def renumber(starts):
+    """
+    Key the rows of stacks of values in order along a single new axis,
+    counting up from the start of the partition holding them.
+    """
+    def rekey(index, it):
+        start = starts[index]
+        for values in it:
+            keys = arange(start, start + len(values), dtype=int64).reshape(-1, 1)
+            start += len(values)
+            yield keys, values
+    return rekey
+
+def rowcounts(it):
+    """
+    Number of rows in the stacks of values of a partition.
+    """
+    return [int(sum([len(v) for v in it]))]
+
+def restack(rows):
+    """
+    Stack the arrays of the rows of a stack along a new first axis.
+    """
+    from numpy import stack
+    try:
+        return stack([asarray(row) for row in rows])
+    except ValueError:
+        raise ValueError("Map operation did not produce values of uniform shape.")
+
 
 class StackedArray(object):
     """
     Wraps a BoltArraySpark and provides an interface for performing
     stacked operations (operations on aggregated subarrays). Many methods
     will be restricted or forbidden until the Stacked object is
-    unstacked. Currently, only map() is implemented. The rationale
-    is that many operations will work faster when vectorized over a
-    slightly larger array.
+    unstacked. Currently map(), filter(), reduce() and statistics are
+    implemented, along with basic indexing. The rationale is that many
+    operations will work faster when vectorized over a slightly
+    larger array.
 
     The implementation uses an intermediate RDD that collects all
     records on a given partition into 'stacked' (key, value) records.
-    Here, a key is a 'size' long tuple of original record keys,
-    and and values is a an array of the corresponding values,
+    Here, a key is a 2-D integer array with one row for each original
+    record key, and values is an array of the corresponding values,
     concatenated along a new 0th dimenion.
     """
-    _metadata = ['_rdd', '_shape', '_split', '_rekeyed']
+    _metadata = ['_rdd', '_shape', '_split', '_rekeyed', '_dtype', '_persisted']
 
-    def __init__(self, rdd, shape=None, split=None, rekeyed=False):
+    _persisted = None
+
+    # values up to this many bytes are considered small, and are moved in stacks
+    SMALL = 64 * 1024
+
+    @staticmethod
+    def small(value_shape, dtype):
+        """
+        Whether values of this shape and dtype are small enough that records are better held in stacks.
+        """
+        from numpy import prod, dtype as getdtype
+        if dtype is None or getdtype(dtype).hasobject:
+            return False
+        return prod(value_shape) * getdtype(dtype).itemsize <= StackedArray.SMALL
+
+    def __init__(self, rdd, shape=None, split=None, rekeyed=False, dtype=None):
         self._rdd = rdd
         self._shape = shape
         self._split = split
         self._rekeyed = rekeyed
+        self._dtype = dtype
 
     def __finalize__(self, other):
         for name in self._metadata:
@@ -43,66 +120,150 @@ class StackedArray(object):
     def rekey(self):
         return self._rekeyed
 
+    @property
+    def dtype(self):
+        return self._dtype
+
     @property
     def _constructor(self):
         return StackedArray
 
-    def stack(self, size):
+    def stack(self, size="auto"):
         """
         Make an intermediate RDD where all records are combined into a
         list of keys and larger ndarray along a new 0th dimension.
+
+        The size is either a number of records, or a number of bytes
+        given as a string with units (e.g. "64MB"), in which case the
+        number of records is found from the size of the first record
+        on each partition. With "auto", the number of bytes is chosen
+        by stacksize. None or 0 stack each partition into a single array.
         """
+        split = self.split
+
+        if size == "auto":
+            size = self.stacksize()
+        nbytes = parse_size(size) if isinstance(size, str) else None
+
+        def whole(partition):
+            records = list(partition)
+            if records:
+                first = asarray(records[0][1])
+                keys = empty((len(records), split), dtype=int64)
+                values = empty((len(records),) + first.shape, dtype=first.dtype)
+                for i, (key, arr) in enumerate(records):
+                    keys[i], values[i] = key, arr
+                yield keys, values
+
         def tostacks(partition):
-            keys = []
-            arrs = []
+            # each stack is preallocated, and filled in place as records arrive
+            count, keys, values, n = size, None, None, 0
             for key, arr in partition:
-                keys.append(key)
-                arrs.append(arr)
-                if size and 0 <= size <= len(keys):
-                    yield (keys, asarray(arrs))
-                    keys, arrs = [], []
-            if keys:
-                yield (keys, asarray(arrs))
-
-        rdd = self._rdd.mapPartitions(tostacks)
+                if values is None:
+                    arr = asarray(arr)
+                    if nbytes is not None and count is None:
+                        count = max(nbytes // max(arr.nbytes, 1), 1)
+                    keys = empty((count, split), dtype=int64)
+                    values = empty((count,) + arr.shape, dtype=arr.dtype)
+                    n = 0
+                keys[n], values[n] = key, arr
+                n += 1
+                if n == count:
+                    yield keys, values
+                    keys, values = None, None
+            if values is not None:
+                yield keys[:n], values[:n]
+
+        if nbytes is not None:
+            size = None
+        func = whole if nbytes is None and (not size or size < 0) else tostacks
+
+        rdd = self._rdd.mapPartitions(func)
         return self._constructor(rdd).__finalize__(self)
 
+    def stacksize(self, memory=None):
+        """
+        Choose a size (in bytes) for stacks of this array.
+
+        Stacks of a few megabytes are large enough that vectorized
+        operations run at full speed, so stacks are no larger than 16 MB,
+        and no larger than a fraction of the memory available to each task.
+
+        Parameters
+        ----------
+        memory : int or str, optional, default=None
+            Memory budget for a single task, in bytes or as a string with
+            units (e.g. "512m"), see bolt.spark.utils.task_memory.
+
+        Returns
+        -------
+        str
+        """
+        return "%db" % stackbytes(self._rdd.context, memory)
+
     def unstack(self):
         """
-        Unstack array and return a new BoltArraySpark via flatMap().
+        Return a new BoltArraySpark with the records of this array.
+
+        The array keeps the stacks as they are, and only splits them into
+        records (with a flatMap) for operations that are not performed on
+        stacks directly (see BoltArraySpark._blocks).
         """
         from bolt.spark.array import BoltArraySpark
 
-        if self._rekeyed:
-            rdd = self._rdd
-        else:
-            rdd = self._rdd.flatMap(lambda kv: zip(kv[0], list(kv[1])))
-
-        return BoltArraySpark(rdd, shape=self.shape, split=self.split)
+        arr = BoltArraySpark(self._rdd, shape=self.shape, split=self.split, dtype=self.dtype)
+        arr._blocked = not self._rekeyed
+        arr._persisted = self._persisted
+        return arr
 
-    def map(self, func):
+    def map(self, func, value_shape=None, dtype=None, with_keys=False):
         """
         Apply a function on each subarray.
 
         Parameters
         ----------
-        func : function 
-             This is applied to each value in the intermediate RDD.
+        func : function
+             This is applied to each value in the intermediate RDD. If
+             with_keys=True, it is applied to a (keys, values) pair,
+             where keys is the 2-D array of keys of the stack.
+
+        value_shape : tuple, optional, default=None
+            Known shape of each of the original records after the map.
+            If given, stacks keep their keys, and the function is not
+            evaluated to infer the shape.
+
+        dtype : numpy.dtype, optional, default=None
+            Known dtype of values resulting from the map
+
+        with_keys : bool, optional, default=False
+            Include the keys of each stack as an argument to the function
 
         Returns
         -------
         StackedArray
         """
+        if with_keys:
+            apply = func
+        else:
+            apply = lambda kv: func(kv[1])
+
+        if value_shape is not None:
+            shape = tuple(self.shape[0:self.split]) + tupleize(value_shape)
+            rdd = self._rdd.map(lambda kv: (kv[0], apply(kv)))
+            mapped = self._constructor(rdd, rekeyed=self._rekeyed, shape=shape).__finalize__(self)
+            mapped._dtype = dtype
+            return mapped
+
         vshape = self.shape[self.split:]
-        x = self._rdd.values().first()
+        k, x = probe(self._rdd.first)
         if x.shape == vshape:
-            a, b = asarray([x]), asarray([x, x])
+            a, b = (k, asarray([x])), (k, asarray([x, x]))
         else:
-            a, b = x, concatenate((x, x))
+            a, b = (k, x), (concatenate((k, k)), concatenate((x, x)))
 
         try:
-            atest = func(a)
-            btest = func(b)
+            atest = apply(a)
+            btest = apply(b)
         except Exception as e:
             raise RuntimeError("Error evaluating function on test array, got error:\n %s" % e)
 
@@ -113,27 +274,359 @@ class StackedArray(object):
         elif atest.shape == btest.shape:
             if self._rekeyed is True:
                 # we've already rekeyed
-                rdd = self._rdd.map(lambda kv: (kv[0], func(kv[1])))
+                rdd = self._rdd.map(lambda kv: (kv[0], apply(kv)))
                 shape = (self.shape[0],) + atest.shape
             else:
                 # do the rekeying
-                count, rdd = zip_with_index(self._rdd.values())
-                rdd = rdd.map(lambda kv: ((kv[1],), func(kv[0])))
+                count, rdd = zip_with_index(self._rdd)
+                rdd = rdd.map(lambda kv: ((kv[1],), apply(kv[0])))
                 shape = (count,) + atest.shape
             split = 1
             rekeyed = True
 
         # different shapes stay different (along the first dimension)
-        elif atest.shape[0] == a.shape[0] and btest.shape[0] == b.shape[0]:
+        elif atest.shape[0] == a[1].shape[0] and btest.shape[0] == b[1].shape[0]:
             shape = self.shape[0:self.split] + atest.shape[1:]
             split = self.split
-            rdd = self._rdd.map(lambda kv: (kv[0], func(kv[1])))
+            rdd = self._rdd.map(lambda kv: (kv[0], apply(kv)))
             rekeyed = self._rekeyed
 
         else:
             raise ValueError("Cannot infer effect of function on shape")
 
-        return self._constructor(rdd, rekeyed=rekeyed, shape=shape, split=split).__finalize__(self)
+        return self._constructor(rdd, rekeyed=rekeyed, shape=shape, split=split,
+                                 dtype=atest.dtype).__finalize__(self)
+
+    def __getitem__(self, index):
+        """
+        Get an item from the array through basic indexing.
+
+        Records are selected from each stack with a mask over its keys,
+        and the stacked values are sliced directly, without unstacking.
+        If every key axis is indexed by an int, the single matching value
+        is returned as a local array.
+
+        Parameters
+        ----------
+        index : tuple of slices or ints
+            One or more index specifications
+
+        Returns
+        -------
+        StackedArray or ndarray
+        """
+        index = list(index) if isinstance(index, tuple) else [index]
+        if len(index) > len(self.shape):
+            raise ValueError("Too many indices for array")
+        if not all([isinstance(i, (slice, int)) for i in index]):
+            raise ValueError("Stacked arrays only support indexing with slices and ints")
+        index += [slice(None)] * (len(self.shape) - len(index))
+
+        if self._rekeyed:
+            # one record per stack, so unstacking is cheap
+            result = self.unstack()[tuple(index)]
+            return result.stack() if hasattr(result, 'stack') else result
+
+        split = self.split
+        isint = [isinstance(i, int) for i in index]
+        slices = [slicify(i, d) for i, d in zip(index, self.shape)]
+        for s, d in zip(slices, self.shape):
+            lo, hi = (s.start, s.stop) if s.step > 0 else (s.stop, s.start)
+            if lo > d - 1 or hi < 1 or lo >= hi:
+                raise ValueError("Index %s would produce an empty dimension" % s)
+
+        keep = [i for i in range(split) if not isint[i]]
+        starts = asarray([s.start for s in slices[:split]])
+        steps = asarray([s.step for s in slices[:split]])
+
+        # ints drop their axis from the values, slices with stop=-1 run to the start
+        vindex = tuple([index[i] if isint[i] else
+                        (s if s.stop != -1 else slice(s.start, None, s.step))
+                        for i, s in enumerate(slices) if i >= split])
+
+        def select(kv):
+            keys, values = kv
+            mask = ones(len(keys), dtype=bool)
+            for j, s in enumerate(slices[:split]):
+                k = keys[:, j]
+                if s.step > 0:
+                    mask &= (k >= s.start) & (k < s.stop)
+                else:
+                    mask &= (k <= s.start) & (k > s.stop)
+                mask &= (k - s.start) % s.step == 0
+            if not mask.any():
+                return []
+            newkeys = ((keys[mask] - starts) // steps)[:, keep]
+            return [(newkeys, values[mask][(slice(None),) + vindex])]
+
+        rdd = self._rdd.flatMap(select)
+
+        if not keep:
+            return rdd.values().first()[0]
+
+        shape = tuple([int(ceil((s.stop - s.start) / float(s.step)))
+                       for s, i in zip(slices, isint) if not i])
+        return self._constructor(rdd, shape=shape, split=len(keep)).__finalize__(self)
+
+    def toarray(self):
+        """
+        Returns the contents as a local array.
+
+        Each stack is written into place with a single assignment
+        using its keys. Raises a ValueError if the stacks do not hold
+        each key exactly once.
+
+        Returns
+        -------
+        ndarray
+        """
+        if self._rekeyed:
+            return self.unstack().toarray()
+
+        out = None if self.dtype is None else empty(self.shape, dtype=self.dtype)
+        written = zeros(self.shape[:self.split], dtype=bool)
+        count = 0
+        for keys, values in self._rdd.toLocalIterator():
+            if out is None:
+                out = empty(self.shape, dtype=values.dtype)
+            place(out, written, tuple(keys.T), values)
+            count += len(keys)
+        check_placed(written, count)
+        return empty(self.shape) if out is None else out
+
+    def _partials(self, axis, partial):
+        """
+        Reduce each stack over an axis, separately for each key of the remaining key axes.
+
+        Rows of a stack are grouped by the key axes that are kept, and
+        each group is passed to partial along with the axes to reduce
+        (its first axis, and any value axes being reduced).
+
+        Returns
+        -------
+        (RDD, list)
+            Pairs of kept keys and partial results, and the kept key axes
+        """
+        from numpy import unique, argsort, bincount, cumsum, split as divide
+
+        split = self.split
+        kkeep = [k for k in range(split) if k not in axis]
+        axes = (0,) + tuple([1 + a - split for a in axis if a >= split])
+
+        def grouped(kv):
+            keys, values = kv
+            if not kkeep:
+                return [((), partial(values, axes))]
+            kept = keys[:, kkeep]
+            groups, inverse = unique(kept, axis=0, return_inverse=True)
+            inverse = inverse.reshape(-1)
+            rows = divide(argsort(inverse, kind='mergesort'), cumsum(bincount(inverse))[:-1])
+            return [(tuple(g.tolist()), partial(values[r], axes)) for g, r in zip(groups, rows)]
+
+        return self._rdd.flatMap(grouped), kkeep
+
+    def reduce(self, func, axis=(0,), keepdims=False):
+        """
+        Reduce an array along an axis.
+
+        Applies a commutative/associative function of two arguments
+        cumulatively to all arrays along an axis. Each stack is reduced
+        locally first, over all of its rows at once if the function is
+        a NumPy ufunc, and the partial results are then combined.
+
+        Parameters
+        ----------
+        func : function
+            Function of two arrays that returns a single array
+
+        axis : tuple or int, optional, default=(0,)
+            Axis or multiple axes to reduce along.
+
+        keepdims : boolean, optional, default=False
+            Keep axis remaining after operation with size 1.
+
+        Returns
+        -------
+        BoltArrayLocal
+        """
+        from functools import reduce
+        from numpy import ufunc, expand_dims
+        from bolt.local.array import BoltArrayLocal
+        from bolt.utils import inshape
+
+        if self._rekeyed:
+            return self.unstack().reduce(func, axis, keepdims)
+
+        axis = tuple(sorted(tupleize(axis)))
+        inshape(self.shape, axis)
+
+        def partial(block, axes):
+            if isinstance(func, ufunc):
+                return func.reduce(block, axis=axes)
+            return reduce(func, _collapse(block, axes))
+
+        rdd, kkeep = self._partials(axis, partial)
+        if not kkeep:
+            arr = rdd.values().treeReduce(func, depth=3)
+        else:
+            records = sorted(rdd.reduceByKey(func).collect(), key=lambda kv: kv[0])
+            arr = asarray([v for (_, v) in records])
+            arr = arr.reshape(tuple([self.shape[k] for k in kkeep]) + arr.shape[1:])
+
+        if keepdims:
+            for i in axis:
+                arr = expand_dims(arr, axis=i)
+
+        if not isinstance(arr, ndarray):
+            return arr
+        elif arr.shape == (1,):
+            return arr[0]
+
+        return BoltArrayLocal(arr)
+
+    def _counters(self, axis, stats):
+        """
+        Aggregate StatCounters over an axis in a single pass, see BoltArraySpark._counters.
+        """
+        from bolt.spark.statcounter import StatCounter
+
+        def partial(block, axes):
+            return StatCounter(stats=stats).mergeblock(_collapse(block, axes))
+
+        rdd, kkeep = self._partials(axis, partial)
+        reducer = lambda left, right: left.combine(right)
+        if not kkeep:
+            return [((), rdd.values().treeReduce(reducer, depth=3))], ()
+        counters = sorted(rdd.reduceByKey(reducer).collect(), key=lambda kv: kv[0])
+        return counters, tuple([self.shape[k] for k in kkeep])
+
+    def _stat(self, axis=None, func=None, name=None, keepdims=False):
+        """
+        Compute a statistic over an axis, see BoltArraySpark._stat.
+        """
+        if axis is None:
+            axis = list(range(len(self.shape)))
+        axis = tuple(sorted(tupleize(axis)))
+
+        if func and not name:
+            return self.reduce(func, axis, keepdims)
+
+        if self._rekeyed:
+            return self.unstack()._stat(axis, name=name, keepdims=keepdims)
+
+        return statistics(self, axis, [name], keepdims)[0]
+
+    def stats(self, axis=None, stats=('mean', 'std', 'min', 'max'), keepdims=False):
+        """
+        Return several statistics of the array over the given axis, see BoltArraySpark.stats.
+        """
+        if self._rekeyed:
+            return self.unstack().stats(axis, stats, keepdims)
+
+        return summarize(self, axis, stats, keepdims)
+
+    def sum(self, axis=None, keepdims=False):
+        """
+        Return the sum of the array over the given axis.
+        """
+        from numpy import add
+        return self._stat(axis, func=add, keepdims=keepdims)
+
+    def mean(self, axis=None, keepdims=False):
+        """
+        Return the mean of the array over the given axis.
+        """
+        return self._stat(axis, name='mean', keepdims=keepdims)
+
+    def var(self, axis=None, keepdims=False):
+        """
+        Return the variance of the array over the given axis.
+        """
+        return self._stat(axis, name='variance', keepdims=keepdims)
+
+    def std(self, axis=None, keepdims=False):
+        """
+        Return the standard deviation of the array over the given axis.
+        """
+        return self._stat(axis, name='stdev', keepdims=keepdims)
+
+    def max(self, axis=None, keepdims=False):
+        """
+        Return the maximum of the array over the given axis.
+        """
+        from numpy import maximum
+        return self._stat(axis, func=maximum, keepdims=keepdims)
+
+    def min(self, axis=None, keepdims=False):
+        """
+        Return the minimum of the array over the given axis.
+        """
+        from numpy import minimum
+        return self._stat(axis, func=minimum, keepdims=keepdims)
+
+    def filter(self, func):
+        """
+        Filter the records of the array.
+
+        The function is applied to the values of each stack at once, and
+        should return a boolean array with one element for each row. As
+        for BoltArraySpark.filter, the records that remain are indexed
+        along a single new key axis.
+
+        The stacks that remain are kept (in memory, or on disk if needed)
+        while their rows are counted, so the function is only evaluated
+        once. Use unpersist on the result, or on arrays derived from it,
+        to release them.
+
+        Parameters
+        ----------
+        func : function
+            Function of a stack of values, should return a boolean array
+
+        Returns
+        -------
+        StackedArray
+        """
+        if self._rekeyed:
+            raise NotImplementedError("Cannot filter a stacked array after its stacks were rekeyed")
+
+        rdd = self._selected(func)
+
+        # number the remaining rows in order, using the count on each partition
+        counts = rdd.mapPartitions(rowcounts).collect()
+        starts = [0]
+        for c in counts[:-1]:
+            starts.append(starts[-1] + c)
+        count = sum(counts)
+
+        selected = rdd.mapPartitionsWithIndex(renumber(starts))
+        shape = (count,) + tuple(self.shape[self.split:]) if count else (0,)
+        result = self._constructor(selected, shape=shape, split=1).__finalize__(self)
+        result._persisted = rdd
+        return result
+
+    def _selected(self, func):
+        """
+        Values of each stack at the rows where func is true, skipping empty
+        stacks, and kept (in memory, or on disk if needed), see filter.
+        """
+        from pyspark import StorageLevel
+
+        def select(values):
+            mask = asarray(func(values), dtype=bool).reshape(-1)
+            if mask.shape != (len(values),):
+                raise ValueError("Filter must return one boolean for each row of a stack")
+            return values[mask]
+
+        rdd = self._rdd.values().map(select).filter(lambda v: len(v) > 0)
+        return rdd.persist(StorageLevel.MEMORY_AND_DISK)
+
+    def unpersist(self):
+        """
+        Release the stacks kept by filter, if this array is derived from one.
+        """
+        if self._persisted is not None:
+            self._persisted.unpersist()
 
     def tordd(self):
         """
@@ -22,7 +22,7 @@
 import copy
 from itertools import chain
 
-from numpy import sqrt
+from numpy import sqrt, asarray, minimum, maximum, count_nonzero
 
 
 class StatCounter(object):
@@ -32,20 +32,39 @@ class StatCounter(object):
         'sum': ('mu',),
         'variance': ('mu', 'm2'),
         'stdev': ('mu', 'm2'),
-        'all': ('mu', 'm2')
+        'sumsq': ('mu', 'm2'),
+        'min': ('minValue',),
+        'max': ('maxValue',),
+        'nnz': ('nnz',),
+        'all': ('mu', 'm2', 'minValue', 'maxValue', 'nnz')
     }
 
+    # approximate size (in bytes) of the blocks of values that are merged at once
+    BLOCKSIZE = 16 * 1024 ** 2
+
     def __init__(self, values=(), stats='all'):
         self.n = 0
         self.mu = 0.0
         self.m2 = 0.0
+        self.minValue = float('inf')
+        self.maxValue = float('-inf')
+        self.nnz = 0
 
         if isinstance(stats, str):
             stats = [stats]
         self.required = frozenset(chain().from_iterable([StatCounter.REQUIRED_FOR[stat] for stat in stats]))
 
+        # stack values into blocks of bounded size and merge each at once
+        block, limit = [], None
         for v in values:
-            self.merge(v)
+            block.append(v)
+            if limit is None:
+                limit = max(1, StatCounter.BLOCKSIZE // max(1, asarray(v).nbytes))
+            if len(block) >= limit:
+                self.mergeblock(asarray(block))
+                block = []
+        if block:
+            self.mergeblock(asarray(block))
 
     # add a value into this StatCounter, updating the statistics
     def merge(self, value):
@@ -55,9 +74,36 @@ class StatCounter(object):
             self.mu += delta / self.n
             if self.__requires('m2'):
                 self.m2 += delta * (value - self.mu)
+        if self.__requires('minValue'):
+            self.minValue = minimum(self.minValue, value)
+        if self.__requires('maxValue'):
+            self.maxValue = maximum(self.maxValue, value)
+        if self.__requires('nnz'):
+            self.nnz += (value != 0)
 
         return self
 
+    # add a block of values stacked along the first axis into this StatCounter
+    def mergeblock(self, block):
+        if len(block) == 0:
+            return self
+
+        other = StatCounter(stats=())
+        other.required = self.required
+        other.n = len(block)
+        if self.__requires('mu'):
+            other.mu = block.mean(axis=0)
+            if self.__requires('m2'):
+                other.m2 = ((block - other.mu) ** 2).sum(axis=0)
+        if self.__requires('minValue'):
+            other.minValue = block.min(axis=0)
+        if self.__requires('maxValue'):
+            other.maxValue = block.max(axis=0)
+        if self.__requires('nnz'):
+            other.nnz = count_nonzero(block, axis=0) if block.ndim > 1 else count_nonzero(block)
+
+        return self.combine(other)
+
     # checks whether the passed attribute name is required to be updated in order to support the
     # statistics requested in self.requested
     def __requires(self, attrname):
@@ -71,14 +117,14 @@ class StatCounter(object):
         # reference equality holds
         if other is self:
             # avoid overwriting fields in a weird order
-            self.merge(copy.deepcopy(other))
+            self.combine(copy.deepcopy(other))
         else:
             # accumulator should only be updated if it's valid in both statcounters
             self.required = set(self.required).intersection(set(other.required))
 
             if self.n == 0:
                 self.n = other.n
-                for attrname in ('mu', 'm2'):
+                for attrname in ('mu', 'm2', 'minValue', 'maxValue', 'nnz'):
                     if self.__requires(attrname):
                         setattr(self, attrname, getattr(other, attrname))
 
@@ -95,6 +141,13 @@ class StatCounter(object):
                     if self.__requires('m2'):
                         self.m2 += other.m2 + (delta * delta * self.n * other.n) / (self.n + other.n)
 
+                if self.__requires('minValue'):
+                    self.minValue = minimum(self.minValue, other.minValue)
+                if self.__requires('maxValue'):
+                    self.maxValue = maximum(self.maxValue, other.maxValue)
+                if self.__requires('nnz'):
+                    self.nnz = self.nnz + other.nnz
+
                 self.n += other.n
         return self
 
@@ -128,3 +181,18 @@ class StatCounter(object):
     def stdev(self):
         self.__isavail('stdev')
         return sqrt(self.variance)
+
+    @property
+    def sumsq(self):
+        self.__isavail('sumsq')
+        return self.m2 + self.n * self.mu * self.mu
+
+    @property
+    def min(self):
+        self.__isavail('min')
+        return self.minValue
+
+    @property
+    def max(self):
+        self.__isavail('max')
+        return self.maxValue
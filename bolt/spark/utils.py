@@ -1,3 +1,7 @@
+import warnings
+from weakref import WeakKeyDictionary
+from numpy import asarray, empty
+
 def get_kv_shape(shape, key_axes):
     func = lambda axis: shape[axis]
     return _get_kv_func(func, shape, key_axes)
@@ -29,3 +33,276 @@ def zip_with_index(rdd):
             yield v, i
 
     return count, rdd.mapPartitionsWithIndex(func)
+
+def parse_size(size):
+    """
+    Convert a size in bytes, or a string with units (e.g. "64MB", "512m", "2g"), into bytes.
+    """
+    if not isinstance(size, str):
+        return int(size)
+    units = {'': 1, 'k': 1024, 'm': 1024 ** 2, 'g': 1024 ** 3, 't': 1024 ** 4}
+    s = size.strip().lower()
+    if s.endswith('b'):
+        s = s[:-1]
+    unit = s[-1] if s and s[-1] in units else ''
+    number = s[:-1] if unit else s
+    try:
+        return int(float(number) * units[unit])
+    except ValueError:
+        raise ValueError("Size %s not understood" % size)
+
+def task_memory(context, memory=None):
+    """
+    Memory budget for a single task, in bytes.
+
+    Uses the given budget if any, otherwise the Spark configuration
+    'bolt.task.memory' if set, otherwise 'spark.executor.memory'
+    divided by 'spark.executor.cores'.
+    """
+    if memory is None:
+        conf = context.getConf()
+        memory = conf.get('bolt.task.memory', None)
+        if memory is None:
+            executor = parse_size(conf.get('spark.executor.memory', '1g'))
+            memory = executor // int(conf.get('spark.executor.cores', '1'))
+    return parse_size(memory)
+
+def place(out, written, keys, values):
+    """
+    Write values into an array by key, marking the keys that were written.
+
+    Values are only cast to the dtype of the array within the same kind
+    (e.g. float64 to float32), other casts raise a TypeError.
+
+    Parameters
+    ----------
+    out : ndarray
+        Array to write into.
+
+    written : ndarray
+        Boolean array over the keys, set where values are written.
+
+    keys : tuple
+        Index along each key axis, integers or arrays for several records.
+
+    values : ndarray
+        Values to write at the keys.
+    """
+    from numpy import can_cast
+    if not can_cast(values.dtype, out.dtype, 'same_kind'):
+        raise TypeError("Cannot write values of dtype %s into an array of dtype %s"
+                        % (values.dtype, out.dtype))
+    out[keys + (Ellipsis,)] = values
+    written[keys] = True
+
+def check_placed(written, count):
+    """
+    Raise a ValueError unless every key was written by exactly one record (see place).
+    """
+    if count != written.size or not written.all():
+        raise ValueError("Collected %d records for %d keys, with %d keys missing, "
+                         "keys must be complete and unique"
+                         % (count, written.size, written.size - written.sum()))
+
+STATISTICS = {'mean': 'mean', 'var': 'variance', 'std': 'stdev', 'sum': 'sum',
+              'min': 'min', 'max': 'max', 'count': None}
+
+def gather(counters, shape, name):
+    """
+    Collect a named statistic from the counters of each key into one array.
+    """
+    values = [getattr(counter, name) for (_, counter) in counters]
+    if not shape:
+        return values[0]
+    arr = asarray(values)
+    return arr.reshape(shape + arr.shape[1:])
+
+def statistics(arr, axis, names, keepdims=False):
+    """
+    Compute named statistics of an array in a single pass.
+
+    The StatCounters are aggregated by the _counters method of the
+    array (see BoltArraySpark._counters and StackedArray._counters).
+
+    Parameters
+    ----------
+    arr : BoltArraySpark or StackedArray
+        Array to compute statistics of.
+
+    axis : tuple or int
+        Axis to compute statistics over, if None will compute over all axes.
+
+    names : list of str
+        Named statistics of StatCounter, or None for the count.
+
+    keepdims : boolean, optional, default=False
+        Keep axis remaining after operation with size 1.
+
+    Returns
+    -------
+    list
+        The value of each statistic
+    """
+    from numpy import expand_dims
+    from bolt.local.array import BoltArrayLocal
+    from bolt.utils import tupleize
+
+    if axis is None:
+        axis = list(range(len(arr.shape)))
+    axis = tuple(sorted(tupleize(axis)))
+    counters, shape = arr._counters(axis, [name for name in names if name is not None])
+
+    results = []
+    for name in names:
+        if name is None:
+            results.append(counters[0][1].count())
+            continue
+        value = gather(counters, shape, name)
+        if keepdims:
+            for i in axis:
+                value = expand_dims(value, axis=i)
+        results.append(BoltArrayLocal(value).toscalar())
+    return results
+
+def summarize(arr, axis, stats, keepdims=False):
+    """
+    Compute several statistics of an array, keyed by name, see BoltArraySpark.stats.
+    """
+    stats = [stats] if isinstance(stats, str) else list(stats)
+    for stat in stats:
+        if stat not in STATISTICS:
+            raise ValueError("Statistic '%s' not understood, must be one of %s"
+                             % (stat, ", ".join(sorted(STATISTICS))))
+    values = statistics(arr, axis, [STATISTICS[stat] for stat in stats], keepdims)
+    return dict(zip(stats, values))
+
+def packing(context, dtype):
+    """
+    Whether records of the given dtype should be sent as packed buffers.
+
+    Opt in with the Spark property 'bolt.serializer' set to 'bytes',
+    either in the configuration or as a local property of the context.
+    Packing needs a known dtype without Python objects.
+    """
+    from numpy import dtype as getdtype
+    mode = context.getLocalProperty('bolt.serializer')
+    if mode is None:
+        mode = context.getConf().get('bolt.serializer', 'pickle')
+    if mode not in ('pickle', 'bytes'):
+        raise ValueError("Serializer %s not understood, must be 'pickle' or 'bytes'" % mode)
+    return mode == 'bytes' and dtype is not None and not getdtype(dtype).hasobject
+
+def pack(header, value):
+    """
+    Encode a tuple of integers and an array as a single buffer.
+
+    The integers are packed as int64 followed by the raw contents of the
+    array, which serializes with much less overhead than a pickled tuple
+    and ndarray. The dtype and shape are not stored, see unpack.
+    """
+    from numpy import frombuffer, int64
+    header = asarray(header, dtype=int64).reshape(-1)
+    value = asarray(value)
+    buf = bytearray(header.nbytes + value.nbytes)
+    frombuffer(buf, int64, len(header))[:] = header
+    if value.nbytes:
+        frombuffer(buf, value.dtype, value.size, header.nbytes).reshape(value.shape)[...] = value
+    return buf
+
+def unpack(buf, nheader, dtype, shape=None):
+    """
+    Decode a buffer made by pack into the tuple of integers and the array.
+
+    The array is a writeable view of the buffer, without a copy. If no
+    shape is given the array is one-dimensional.
+    """
+    from numpy import frombuffer, int64, dtype as getdtype
+    dtype = getdtype(dtype)
+    header = tuple(frombuffer(buf, int64, nheader).tolist())
+    size = (len(buf) - 8 * nheader) // dtype.itemsize
+    if size:
+        value = frombuffer(buf, dtype, size, 8 * nheader)
+    else:
+        value = empty(0, dtype=dtype)
+    return header, value if shape is None else value.reshape(shape)
+
+_probes = [0]
+_inferred = WeakKeyDictionary()
+
+def probes(reset=False):
+    """
+    Number of Spark jobs run so far to infer the result of a function.
+
+    Parameters
+    ----------
+    reset : bool, optional, default=False
+        Whether to set the count back to zero, the previous count is returned.
+    """
+    count = _probes[0]
+    if reset:
+        _probes[0] = 0
+    return count
+
+def probe(first):
+    """
+    Run a Spark job fetching a record to infer the result of a function.
+
+    Each probe is counted (see probes) and issues a warning, as it can be
+    avoided by passing the known shape and dtype of the result.
+    """
+    _probes[0] += 1
+    warnings.warn("Running a Spark job to infer the shape and dtype of a mapped function, "
+                  "pass value_shape and dtype to avoid it (%d so far)" % _probes[0], stacklevel=3)
+    return first()
+
+def infer_result(func, shape, dtype, first, with_keys=False):
+    """
+    Infer the shape and dtype of the values returned by a function.
+
+    The function is first evaluated on the driver on a random array
+    with the given shape and dtype. If that fails, it is evaluated on a
+    real record returned by first, which runs a Spark job (see probe).
+    Results are remembered for each function, input shape and dtype for
+    as long as the function exists (functions are weakly referenced), so
+    repeating a map does not evaluate the function again. Functions whose
+    result shape or dtype can change between calls (e.g. with mutable
+    state) should be mapped with a known value_shape and dtype instead.
+
+    Parameters
+    ----------
+    func : function
+        Function of an array, or of a (key, array) pair if with_keys=True.
+
+    shape : tuple
+        Shape of the input arrays.
+
+    dtype : numpy.dtype
+        Dtype of the input arrays.
+
+    first : function
+        Returns the first (key, array) record of the input.
+
+    with_keys : bool, optional, default=False
+        Whether the function takes keys as well as arrays.
+    """
+    from numpy import random, dtype as getdtype
+    shape = tuple(shape)
+    entry = (shape, str(getdtype(dtype)), with_keys)
+    try:
+        known = _inferred.setdefault(func, {})
+    except TypeError:
+        # functions that cannot be weakly referenced are not remembered
+        known = {}
+    if entry in known:
+        return known[entry]
+
+    apply = func if with_keys else lambda kv: func(kv[1])
+    try:
+        mapped = apply(((0,), random.randn(*shape).astype(dtype)))
+    except Exception:
+        mapped = apply(probe(first))
+    mapped = asarray(mapped)
+    result = (mapped.shape, mapped.dtype)
+
+    known[entry] = result
+    return result
@@ -222,3 +222,165 @@ def iterexpand(arry, extra):
     for d in range(arry.ndim, arry.ndim+extra):
         arry = expand_dims(arry, axis=d)
     return arry
+
+def zarrinfo(path):
+    """
+    Read the metadata of an array stored in a zarr (v2) directory.
+
+    Parameters
+    ----------
+    path : str
+        Directory holding the '.zarray' metadata and one file per chunk.
+
+    Returns
+    -------
+    dict
+        With keys 'shape', 'chunks', 'dtype', 'fill_value', 'order',
+        'compressor' and 'separator'
+    """
+    import json
+    from os.path import join
+    from numpy import dtype
+
+    with open(join(path, '.zarray')) as f:
+        meta = json.load(f)
+
+    if meta.get('filters'):
+        raise NotImplementedError("zarr filters are not supported")
+    compressor = meta.get('compressor')
+    compressor = compressor['id'] if compressor else None
+    if compressor not in (None, 'zlib', 'gzip'):
+        raise NotImplementedError("zarr compressor '%s' is not supported" % compressor)
+
+    return {
+        'shape': tuple(meta['shape']),
+        'chunks': tuple(meta['chunks']),
+        'dtype': dtype(meta['dtype']),
+        'fill_value': meta.get('fill_value'),
+        'order': meta.get('order', 'C'),
+        'compressor': compressor,
+        'separator': meta.get('dimension_separator', '.')
+    }
+
+def readzarr(path, region=None, info=None):
+    """
+    Read a region of an array stored in a zarr (v2) directory.
+
+    Only the chunks overlapping the region are read. Missing chunks
+    take the fill value of the array.
+
+    Parameters
+    ----------
+    path : str
+        Directory holding the '.zarray' metadata and one file per chunk.
+
+    region : tuple of slices, optional, default=None
+        Region to read along each axis, with unit steps. If None,
+        reads the whole array.
+
+    info : dict, optional, default=None
+        Metadata as returned by zarrinfo, read from path if None.
+
+    Returns
+    -------
+    ndarray
+    """
+    import zlib
+    from os.path import join, exists
+    from itertools import product
+    from numpy import empty, frombuffer
+
+    info = zarrinfo(path) if info is None else info
+    shape, chunks, dtype = info['shape'], info['chunks'], info['dtype']
+    if region is None:
+        region = tuple(slice(0, s) for s in shape)
+    region = tuple(slice(*r.indices(s)[:2]) for r, s in zip(region, shape))
+
+    fill = info['fill_value']
+    out = empty([r.stop - r.start for r in region], dtype=dtype)
+    if fill is not None:
+        out.fill(fill)
+
+    ranges = [range(r.start // c, (r.stop - 1) // c + 1) if r.stop > r.start else range(0)
+              for r, c in zip(region, chunks)]
+    for ids in product(*ranges):
+        name = join(path, info['separator'].join([str(i) for i in ids]) or '0')
+        if not exists(name):
+            continue
+        with open(name, 'rb') as f:
+            raw = f.read()
+        if info['compressor'] is not None:
+            # zlib streams and gzip members can both be read with a matching window size
+            raw = zlib.decompress(raw, 15 if info['compressor'] == 'zlib' else 31)
+        chunk = frombuffer(raw, dtype=dtype).reshape(chunks, order=info['order'])
+
+        # the part of the chunk inside the region, relative to both
+        src, dst = [], []
+        for i, r, c in zip(ids, region, chunks):
+            lo, hi = max(r.start, i * c), min(r.stop, (i + 1) * c)
+            src.append(slice(lo - i * c, hi - i * c))
+            dst.append(slice(lo - r.start, hi - r.start))
+        out[tuple(dst)] = chunk[tuple(src)]
+
+    return out
+
+def readmeta(path):
+    """
+    Read the metadata of an array saved by BoltArraySpark.save.
+
+    Parameters
+    ----------
+    path : str
+        Directory written by save.
+
+    Returns
+    -------
+    dict
+        With keys 'shape', 'split', 'dtype', 'ordered' and 'counts'
+    """
+    import json
+    from os.path import join
+    from numpy import dtype
+
+    with open(join(path, 'bolt.json')) as f:
+        meta = json.load(f)
+    meta['dtype'] = dtype(meta['dtype'])
+    return meta
+
+def readpart(path, index, count, shape, split, dtype):
+    """
+    Read the keys and values of one partition saved by BoltArraySpark.save.
+
+    Parameters
+    ----------
+    path : str
+        Directory written by save.
+
+    index : int
+        Index of the partition.
+
+    count : int
+        Number of records in the partition.
+
+    shape : tuple
+        Shape of the saved array.
+
+    split : int
+        Number of key axes of the saved array.
+
+    dtype : numpy.dtype
+        Data-type of the saved array.
+
+    Returns
+    -------
+    (ndarray, ndarray)
+        Keys with shape (count, split), and values stacked along a new first axis
+    """
+    from os.path import join
+    from numpy import fromfile, int64
+
+    vshape = tuple(shape[split:])
+    with open(join(path, 'part-%05d' % index), 'rb') as f:
+        values = fromfile(f, dtype=dtype, count=count * int(prod(vshape)))
+        keys = fromfile(f, dtype=int64, count=count * split)
+    return keys.reshape(count, split), values.reshape((count,) + vshape)
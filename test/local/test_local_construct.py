@@ -1,6 +1,7 @@
 import pytest
 from numpy import arange
-from bolt import array, ones, zeros, concatenate
+from bolt import array, ones, zeros, full, concatenate, random, fromnpy, frombinary
+from bolt import arange as barange
 from bolt.utils import allclose
 
 
@@ -23,6 +24,27 @@ def test_zeros():
     b = zeros((2, 3, 4))
     assert allclose(x, b.toarray())
 
+def test_full():
+
+    from numpy import full as npfull
+    x = npfull((2, 3, 4), 7)
+    b = full((2, 3, 4), 7)
+    assert b.dtype == x.dtype
+    assert allclose(x, b.toarray())
+
+def test_arange():
+
+    x = arange(2*3*4).reshape((2, 3, 4))
+    b = barange((2, 3, 4))
+    assert allclose(x, b.toarray())
+    assert allclose(arange(5), barange(5).toarray())
+
+def test_random():
+
+    assert allclose(random.randn((2, 3), seed=1).toarray(), random.randn((2, 3), seed=1).toarray())
+    x = random.uniform((2, 3), low=2, high=3, seed=1).toarray()
+    assert (x >= 2).all() and (x < 3).all()
+
 def test_concatenate():
 
     from numpy import concatenate as npconcatenate
@@ -36,3 +58,15 @@ def test_concatenate_errors():
 
     with pytest.raises(ValueError):
         concatenate(x)
+
+def test_fromfiles(tmpdir):
+
+    from numpy import save
+    x = arange(2*3*4).reshape((2, 3, 4))
+    path = str(tmpdir.join('x.npy'))
+    save(path, x)
+    assert allclose(x, fromnpy(path).toarray())
+
+    path = str(tmpdir.join('x.bin'))
+    x.astype('int16').tofile(path)
+    assert allclose(x, frombinary(path, (2, 3, 4), dtype='int16').toarray())
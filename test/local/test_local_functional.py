@@ -50,3 +50,13 @@ def test_ufuncs():
 
 
 
+
+def test_stats():
+
+    x = arange(2*3*4).reshape(2, 3, 4)
+    b = array(x)
+
+    stats = b.stats(axis=1, stats=('mean', 'std', 'count'))
+    assert allclose(stats['mean'], x.mean(axis=1))
+    assert allclose(stats['std'], x.std(axis=1))
+    assert stats['count'] == 3
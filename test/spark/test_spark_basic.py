@@ -1,6 +1,8 @@
-from numpy import arange, dtype, int64, float64
+import pytest
+from numpy import arange, dtype, int64, float64, load, zeros
 from bolt import array, ones
 from bolt.utils import allclose
+from bolt.spark.array import BoltArraySpark
 
 def test_shape(sc):
 
@@ -62,8 +64,54 @@ def test_repartition(sc):
     b = array(x, sc)
     assert b._ordered
     b = b.repartition(10)
-    assert not b._ordered
+    assert b._ordered
     assert b._rdd.getNumPartitions() == 10
+    assert allclose(b.toarray(), x)
+
+def test_partitioner(sc):
+    from bolt.spark.partitioner import RangePartitioner
+    x = arange(4*3*2).reshape((4, 3, 2))
+    b = array(x, sc, axis=(0, 1), npartitions=3)
+
+    # each partition holds its range of the linearized keys
+    def check(arr):
+        p = arr._partitioner
+        parts = arr.tordd().glom().collect()
+        assert len(parts) == p.npartitions
+        for i, part in enumerate(parts):
+            assert all([p(k) == i for k, _ in part])
+            assert len(part) == p.bounds[i+1] - p.bounds[i]
+    assert b._partitioner == RangePartitioner((4, 3), [0, 4, 8, 12])
+    assert b._partitioner((2, 1)) == 1
+    assert b._partitioner.partitions(3, 9) == [0, 1, 2]
+    assert b._partitioner.partitions(4, 8) == [1]
+    check(b)
+
+    # kept by operations on values, and by reshaping keys
+    assert b.map(lambda v: v * 2, axis=(0, 1))._partitioner == b._partitioner
+    assert b.astype('float32').clip(0, 10)._partitioner == b._partitioner
+    c = b.keys.reshape(12)
+    assert c._partitioner == RangePartitioner((12,), [0, 4, 8, 12])
+    check(c)
+    assert b.swap((0,), ())._partitioner is None
+
+    # filtering and concatenating along the first axis keep ranges in order
+    c = b.filter(lambda v: v.sum() % 3 == 0, axis=(0, 1))
+    assert c._ordered
+    check(c)
+    assert allclose(c.toarray(), x.reshape(12, 2)[x.reshape(12, 2).sum(axis=1) % 3 == 0])
+    c = b.concatenate(b)
+    assert c._ordered
+    assert c._partitioner.bounds.tolist() == [0, 4, 8, 12, 16, 20, 24]
+    check(c)
+
+    # unordered records in known ranges are sorted without a shuffle
+    rdd = b.tordd().mapPartitions(lambda it: reversed(list(it)), preservesPartitioning=True)
+    c = BoltArraySpark(rdd, shape=x.shape, split=2, dtype=x.dtype, ordered=False,
+                       partitioner=b._partitioner)
+    assert c._sorted().getNumPartitions() == 3
+    assert c._sorted().keys().collect() == b.tordd().keys().collect()
+    assert allclose(c.first(), x[0, 0])
 
 def test_concatenate(sc):
 
@@ -156,4 +204,69 @@ def test_clip(sc):
     b = array(a, sc)
     assert allclose(b.clip(0).toarray(), a.clip(0))
     assert allclose(b.clip(2).toarray(), a.clip(2))
-    assert allclose(b.clip(1, 2).toarray(), a.clip(1, 2))
\ No newline at end of file
+    assert allclose(b.clip(1, 2).toarray(), a.clip(1, 2))
+
+def test_deferred(sc):
+
+    x = arange(2*3*4).reshape((2, 1, 3, 4))
+    b = array(x, sc)
+    c = b.astype('float32').clip(2, 20).map(lambda v: v * 2).squeeze().values.transpose(1, 0)
+    assert len(c._deferred) == 5
+    assert b._deferred == ()
+    assert c.shape == (2, 4, 3)
+    assert c.dtype == dtype('float32')
+    expected = (x.astype('float32').clip(2, 20) * 2).squeeze().transpose(0, 2, 1)
+    assert allclose(c.toarray(), expected)
+    assert c._deferred == ()
+
+    c = b.clip(2, 20).squeeze(1)
+    c.cache()
+    assert c._rdd.is_cached
+    assert allclose(c.toarray(), x.clip(2, 20).squeeze(1))
+
+def test_toarray(sc):
+
+    x = arange(2*3*4).reshape((2, 3, 4))
+    b = array(x, sc, axis=(0, 1))
+
+    # records arrive out of key order, and no sort should be needed
+    rdd = b.tordd().sortByKey(ascending=False)
+    c = BoltArraySpark(rdd, shape=x.shape, split=2, dtype=x.dtype, ordered=False)
+    assert c.toarray().dtype == x.dtype
+    assert allclose(c.toarray(), x)
+
+    # without a known dtype the output takes the dtype of the records
+    c = BoltArraySpark(rdd, shape=x.shape, split=2, ordered=False)
+    assert c.toarray().dtype == x.dtype
+    assert allclose(c.toarray(), x)
+
+    # missing or repeated keys, and casts to another kind, are errors
+    missing = BoltArraySpark(rdd.filter(lambda kv: kv[0] != (1, 2)), shape=x.shape, split=2)
+    repeated = BoltArraySpark(rdd.union(rdd.filter(lambda kv: kv[0] == (0, 0))), shape=x.shape, split=2)
+    for c in (missing, repeated):
+        with pytest.raises(ValueError):
+            c.toarray()
+        # with a known dtype, small records are collected in stacks
+        with pytest.raises(ValueError):
+            BoltArraySpark(c.tordd(), shape=x.shape, split=2, dtype=x.dtype).toarray()
+    with pytest.raises(TypeError):
+        BoltArraySpark(rdd.mapValues(lambda v: v / 2.0), shape=x.shape, split=2, dtype=x.dtype).toarray()
+
+def test_tonpy(sc, tmpdir):
+
+    x = arange(2*3*4).reshape((2, 3, 4))
+    b = array(x, sc, axis=(0, 1))
+
+    path = str(tmpdir.join('out.npy'))
+    b.tonpy(path)
+    assert allclose(load(path), x)
+    assert load(path).dtype == x.dtype
+
+    path = str(tmpdir.join('mapped.npy'))
+    out = b.map(lambda v: v * 2.0).toarray(out=path)
+    assert allclose(out, x * 2.0)
+    assert allclose(load(path), x * 2.0)
+
+    out = zeros((2, 3, 4))
+    b.toarray(out=out)
+    assert allclose(out, x)
@@ -2,6 +2,7 @@ import pytest
 from numpy import arange, split, array_equal, empty, newaxis
 from bolt import array, ones
 from bolt.utils import allclose
+from bolt.spark.utils import packing
 
 def test_chunk(sc):
 
@@ -148,6 +149,7 @@ def test_map(sc):
 
     assert allclose(c.map(f).unchunk().toarray(), f_local(x))
     assert allclose(c.map(f, value_shape=(4, 4)).unchunk().toarray(), f_local(x))
+    assert allclose(c.map(f, infer="lazy").unchunk().toarray(), f_local(x))
 
 def test_map_errors(sc):
 
@@ -206,3 +208,59 @@ def test_args(sc):
 
     with pytest.raises(ValueError):
         b.chunk(size=(5, 6))
+
+def test_swap(sc):
+
+    x = arange(4*7*9*6).reshape(4, 7, 9, 6)
+    b = array(x, sc, (0, 1))
+
+    c = b.chunk((4,), axis=(1,)).swap((0,), (1,))
+    assert c.shape == (7, 6, 4, 9)
+    assert c.split == 2
+    assert allclose(c.toarray(), x.transpose(1, 3, 0, 2))
+
+    c = b.chunk((3,), axis=(0,)).swap((0, 1), (0,))
+    assert allclose(c.toarray(), x.transpose(2, 0, 1, 3))
+
+    c = b.chunk((2, 5), axis=(0, 1)).swap((), (0, 1))
+    assert allclose(c.toarray(), x)
+
+    with pytest.raises(ValueError):
+        b.chunk((2, 2)).swap((0,), (0,))
+
+def test_swap_packed(sc):
+
+    x = arange(4*7*9*6, dtype='float32').reshape(4, 7, 9, 6)
+    b = array(x, sc, (0, 1))
+
+    sc.setLocalProperty('bolt.serializer', 'bytes')
+    try:
+        assert packing(sc, x.dtype)
+        c = b.chunk((4,), axis=(1,)).swap((0,), (1,))
+        assert allclose(c.toarray(), x.transpose(1, 3, 0, 2))
+        assert c.toarray().dtype == x.dtype
+
+        c = b.chunk((3, 2), axis=(0, 1)).swap((0, 1), (0, 1))
+        assert allclose(c.toarray(), x.transpose(2, 3, 0, 1))
+
+        # values are writeable after unpacking
+        d = c.map(lambda v: v.__iadd__(1))
+        assert allclose(d.toarray(), x.transpose(2, 3, 0, 1) + 1)
+    finally:
+        sc.setLocalProperty('bolt.serializer', None)
+
+def test_autosize(sc):
+
+    x = arange(4*6*500).reshape(4, 6, 500)
+    b = array(x, sc)
+    c = b.chunk()
+
+    # small arrays use the minimum size
+    assert float(c.autosize()) == 150.0
+    assert allclose(c.unchunk().toarray(), x)
+
+    # the size is limited by the memory budget
+    assert float(c.autosize(memory="160KB")) == 160 * 1024 / 16.0 / 1000
+    assert float(c.autosize(memory=1600000)) == 100.0
+
+    assert allclose(b.swap((0,), (1,)).toarray(), x.transpose(2, 0, 1))
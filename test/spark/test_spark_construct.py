@@ -1,6 +1,7 @@
 import pytest
 from numpy import arange
-from bolt import array, ones, zeros, concatenate
+from bolt import array, ones, zeros, full, empty, concatenate, random, fromnpy, frombinary, fromzarr, load
+from bolt import arange as barange
 from bolt.utils import allclose
 from bolt.spark.array import BoltArraySpark
 
@@ -25,6 +26,12 @@ def test_array(sc):
     assert allclose(x, b.toarray())
     assert b.tordd().getNumPartitions() == 5
 
+    b = array(x, sc, axis=(0, 1), npartitions=3)
+    keys = b.tordd().keys().collect()
+    assert keys == [(i, j) for i in range(2) for j in range(3)]
+    assert b.tordd().glom().map(len).collect() == [2, 2, 2]
+    assert allclose(x, b.toarray())
+
 def test_array_errors(sc):
 
     x = arange(2*3*4).reshape((2, 3, 4))
@@ -57,6 +64,56 @@ def test_zeros(sc):
     b = zeros(5, sc)
     assert allclose(x, b.toarray())
 
+def test_full(sc):
+
+    from numpy import full as npfull
+    x = npfull((2, 3, 4), 7)
+    b = full((2, 3, 4), 7, sc, axis=(0, 1))
+    assert b.dtype == x.dtype
+    assert allclose(x, b.toarray())
+
+    b = full((2, 3, 4), 7, sc, axis=(0, 1), dtype='float32', npartitions=4)
+    assert b.dtype == 'float32'
+    assert b.tordd().getNumPartitions() == 4
+    assert allclose(x, b.toarray())
+
+def test_empty(sc):
+
+    b = empty((2, 3, 4), sc, axis=(0, 1))
+    assert b.shape == (2, 3, 4)
+    assert b.toarray().shape == (2, 3, 4)
+
+def test_arange(sc):
+
+    x = arange(2*3*4).reshape((2, 3, 4))
+    b = barange((2, 3, 4), sc, axis=(0, 1), npartitions=4)
+    assert b.tordd().keys().collect() == [(i, j) for i in range(2) for j in range(3)]
+    assert allclose(x, b.toarray())
+
+    b = barange(10, sc, npartitions=3)
+    assert allclose(arange(10), b.toarray())
+
+    # the requested shape is kept when distributing along other axes
+    assert barange((2, 3, 4), sc, axis=(1,)).shape == (2, 3, 4)
+
+def test_random(sc):
+
+    a = random.randn((10, 3, 4), sc, seed=42, npartitions=3)
+    b = random.randn((10, 3, 4), sc, seed=42, npartitions=3)
+    c = random.randn((10, 3, 4), sc, seed=43, npartitions=3)
+    assert allclose(a.toarray(), b.toarray())
+    assert not allclose(a.toarray(), c.toarray())
+    assert a.toarray().std() > 0.5
+
+    u = random.uniform((10, 3, 4), sc, low=2, high=3, seed=1, npartitions=3)
+    x = u.toarray()
+    assert (x >= 2).all() and (x < 3).all()
+    assert allclose(x, u.toarray())
+
+    # partitions draw from different streams
+    first = u.tordd().values().glom().map(lambda v: v[0]).collect()
+    assert not allclose(first[0], first[1])
+
 def test_concatenate(sc):
 
     from numpy import concatenate as npconcatenate
@@ -94,3 +151,99 @@ def test_concatenate_errors(sc):
 
     with pytest.raises(NotImplementedError):
         concatenate((b, b, b))
+
+def _savezarr(path, x, chunks, compressor=None):
+    import json, os, zlib
+    from itertools import product
+    from numpy import zeros as npzeros
+    os.makedirs(path)
+    meta = {'zarr_format': 2, 'shape': list(x.shape), 'chunks': list(chunks),
+            'dtype': x.dtype.str, 'fill_value': -1, 'order': 'C', 'filters': None,
+            'compressor': {'id': compressor} if compressor else None}
+    with open(os.path.join(path, '.zarray'), 'w') as f:
+        json.dump(meta, f)
+    grid = [range(-(-s // c)) for s, c in zip(x.shape, chunks)]
+    for ids in list(product(*grid))[:-1]:
+        chunk = npzeros(chunks, dtype=x.dtype)
+        part = x[tuple(slice(i * c, (i + 1) * c) for i, c in zip(ids, chunks))]
+        chunk[tuple(slice(0, s) for s in part.shape)] = part
+        raw = chunk.tobytes()
+        with open(os.path.join(path, '.'.join(map(str, ids))), 'wb') as f:
+            f.write(zlib.compress(raw) if compressor else raw)
+
+def test_fromnpy(sc, tmpdir):
+
+    from numpy import save
+    x = arange(4*3*5).reshape((4, 3, 5))
+    path = str(tmpdir.join('x.npy'))
+    save(path, x)
+
+    b = fromnpy(path, sc)
+    assert b.dtype == x.dtype
+    assert allclose(x, b.toarray())
+
+    b = fromnpy(path, sc, axis=(0, 1), npartitions=5)
+    assert b.split == 2
+    assert b.tordd().getNumPartitions() == 5
+    assert allclose(x, b.toarray())
+
+    # key axes come first
+    b = fromnpy(path, sc, axis=(2,), npartitions=2)
+    assert b.shape == (5, 4, 3)
+    assert allclose(x.transpose(2, 0, 1), b.toarray())
+
+def test_frombinary(sc, tmpdir):
+
+    x = arange(4*3*5, dtype='float32').reshape((4, 3, 5))
+    path = str(tmpdir.join('x.bin'))
+    with open(path, 'wb') as f:
+        f.write(b'header')
+        f.write(x.tobytes())
+
+    b = frombinary(path, (4, 3, 5), sc, axis=(0, 1), dtype='float32', offset=6, npartitions=3)
+    assert b.dtype == x.dtype
+    assert allclose(x, b.toarray())
+
+def test_fromzarr(sc, tmpdir):
+
+    x = arange(5*4*3).reshape((5, 4, 3))
+    path = str(tmpdir.join('x.zarr'))
+    _savezarr(path, x, (2, 3, 2), compressor='zlib')
+
+    # the last chunk is missing, and takes the fill value
+    expected = x.copy()
+    expected[4:, 3:, 2:] = -1
+
+    b = fromzarr(path, sc, axis=(0, 1), npartitions=3)
+    assert b.dtype == x.dtype
+    assert allclose(expected, b.toarray())
+
+    b = fromzarr(path, sc, axis=(1,), npartitions=2)
+    assert allclose(expected.transpose(1, 0, 2), b.toarray())
+
+def test_save_load(sc, tmpdir):
+
+    x = arange(4*3*5).reshape((4, 3, 5))
+    b = array(x, sc, axis=(0, 1), npartitions=3)
+
+    path = str(tmpdir.join('saved'))
+    b.save(path)
+    c = load(path, sc)
+    assert c.shape == b.shape
+    assert c.split == b.split
+    assert c.dtype == b.dtype
+    assert c._ordered
+    assert c.tordd().getNumPartitions() == 3
+    assert c.tordd().glom().map(len).collect() == b.tordd().glom().map(len).collect()
+    assert allclose(x, c.toarray())
+
+    # ordering is recorded, and a local array can be loaded too
+    d = b.swap((0,), (0,))
+    path = str(tmpdir.join('swapped'))
+    d.save(path)
+    assert load(path, sc)._ordered == d._ordered
+    assert allclose(d.toarray(), load(path, sc).toarray())
+    assert allclose(d.toarray(), load(path).toarray())
+
+    with pytest.raises(OSError):
+        b.save(path)
@@ -28,6 +28,90 @@ def test_map_with_keys(sc):
     c = b.map(lambda kv: kv[0] + kv[1], with_keys=True)
     assert allclose(b.toarray() + [[0, 0, 0], [1, 1, 1]], c.toarray())
 
+def test_map_inference(sc):
+    from bolt.spark.utils import probes
+
+    x = arange(2*3*4).reshape(2, 3, 4)
+    b = array(x, sc, axis=0)
+
+    # inference on the driver is remembered for the function, shape and dtype
+    calls = []
+    def f(v):
+        calls.append(v.shape)
+        return v[..., :2]
+    assert b.map(f).shape == (2, 3, 2)
+    assert b.map(f).shape == (2, 3, 2)
+    assert calls == [(3, 4)]
+    assert b.map(f, axis=(0, 1)).shape == (2, 3, 2)
+    assert calls == [(3, 4), (4,)]
+
+    # functions failing on random arrays run a counted probe job
+    def g(v):
+        assert v.max() >= v.size - 1
+        return v.sum(axis=0)
+    probes(reset=True)
+    with pytest.warns(UserWarning):
+        c = b.map(g)
+    assert probes() == 1
+    assert c.shape == (2, 4)
+    assert allclose(c.toarray(), x.sum(axis=1))
+
+    # lazy inference never evaluates the function on the driver
+    probes(reset=True)
+    calls = []
+    c = b.map(f, infer="lazy")
+    assert probes() == 0
+    with pytest.warns(UserWarning):
+        assert c.shape == (2, 3, 2)
+    assert c.dtype == x.dtype
+    assert probes() == 1
+    assert calls == []
+    assert allclose(c.toarray(), x[:, :, :2])
+    assert allclose(b.map(f, infer="lazy").sum(axis=0).toarray(), x[:, :, :2].sum(axis=0))
+
+    # operations chained after a lazy map keep the mapped function
+    with pytest.warns(UserWarning):
+        c = b.map(lambda v: v * 10, infer="lazy").astype('float32')
+    assert allclose(c.toarray(), x * 10)
+    with pytest.warns(UserWarning):
+        c = b.map(lambda v: v * 10, infer="lazy").clip(0, 100).map(lambda v: v + 1)
+    assert allclose(c.toarray(), (x * 10).clip(0, 100) + 1)
+
+    # inferred results are only remembered while the function exists
+    import gc
+    from bolt.spark.utils import _inferred
+    def h(v):
+        return v[0]
+    b.map(h)
+    assert h in _inferred
+    count = len(_inferred)
+    del h
+    gc.collect()
+    assert len(_inferred) == count - 1
+
+    with pytest.raises(ValueError):
+        b.map(f, infer="other")
+
+def test_map_validate(sc):
+    x = arange(20).reshape(10, 2)
+    b = array(x, sc, npartitions=1)
+    b.SAMPLED = 2
+
+    def f(v):
+        return v if v[0] < 6 else v[:1]
+
+    with pytest.raises(Exception):
+        b.map(f, value_shape=(2,), dtype=x.dtype).tordd().count()
+
+    for validate in ("sample", "off"):
+        c = b.map(f, value_shape=(2,), dtype=x.dtype, validate=validate)
+        assert c.tordd().values().map(len).collect() == [2] * 3 + [1] * 7
+
+    assert allclose(b.map(lambda v: v * 2, validate="sample").toarray(), x * 2)
+
+    with pytest.raises(ValueError):
+        b.map(f, validate="other")
+
 def test_reduce(sc):
     from numpy import asarray
 
@@ -70,6 +154,60 @@ def test_filter(sc):
     assert r.shape == (b.shape[1], b.shape[0], b.shape[2])
     assert r._split == 1
 
+def test_filter_once(sc):
+
+    x = arange(6*4).reshape(6, 4)
+    b = array(x, sc, axis=0, npartitions=3)
+
+    # count the records the filter evaluates
+    seen = sc.accumulator(0)
+    def f(v):
+        seen.add(1)
+        return v[0] % 8 == 0
+
+    r = b.filter(f)
+    assert seen.value == 6
+    assert r.shape == (3, 4)
+    assert allclose(r.toarray(), x[::2])
+    assert allclose(r[1:].toarray(), x[2::2])
+    assert seen.value == 6
+    r.unpersist()
+
+    # derived arrays can release the records kept by the filter
+    r = b.filter(f)
+    assert r._persisted.is_cached
+    m = r.map(lambda v: v + 1, value_shape=(4,), dtype=x.dtype)[1:]
+    assert m._persisted is r._persisted
+    m.unpersist()
+    assert not r._persisted.is_cached
+
+    # including through a transpose
+    r = b.filter(f)
+    t = r.T
+    assert t._persisted is r._persisted
+    t.unpersist()
+    assert not r._persisted.is_cached
+
+    # a lazy filter is only evaluated once its shape or records are needed
+    seen = sc.accumulator(0)
+    r = b.filter(f, lazy=True)
+    assert seen.value == 0
+    assert r.shape == (3, 4)
+    assert seen.value == 6
+    assert allclose(r.map(lambda v: v * 2).toarray(), x[::2] * 2)
+    assert seen.value == 6
+
+    # and releasing an unused one does not evaluate it
+    seen = sc.accumulator(0)
+    r = b.filter(f, lazy=True)
+    r.unpersist()
+    assert seen.value == 0
+    assert not r._persisted.is_cached
+
+    r = b.filter(lambda v: False, lazy=True)
+    assert r.shape == (0,)
+    assert r.toarray().shape == (0,)
+
 def test_mean(sc):
     x = arange(2*3*4).reshape(2, 3, 4)
     b = array(x, sc, axis=(0,))
@@ -123,3 +261,79 @@ def test_max(sc):
     assert allclose(b.max(axis=0), x.max(axis=0))
     assert allclose(b.max(axis=(0, 1)), x.max(axis=(0, 1)))
     assert b.max(axis=(0, 1, 2)) == x.max(axis=(0, 1, 2))
+
+def test_statcounter(monkeypatch):
+    from numpy import random
+    from bolt.spark.statcounter import StatCounter
+
+    x = random.randn(100, 3, 4)
+    x[x < 0] = 0
+    values = list(x)
+
+    # merge in several blocks, and combine counters over separate values
+    monkeypatch.setattr(StatCounter, 'BLOCKSIZE', 10 * x[0].nbytes)
+    counter = StatCounter(values[:30]).combine(StatCounter(values[30:]))
+    assert counter.count() == 100
+    assert allclose(counter.mean, x.mean(axis=0))
+    assert allclose(counter.sum, x.sum(axis=0))
+    assert allclose(counter.variance, x.var(axis=0))
+    assert allclose(counter.stdev, x.std(axis=0))
+    assert allclose(counter.sumsq, (x ** 2).sum(axis=0))
+    assert allclose(counter.min, x.min(axis=0))
+    assert allclose(counter.max, x.max(axis=0))
+    assert allclose(counter.nnz, (x != 0).sum(axis=0))
+
+    # values merged one at a time give the same result
+    single = StatCounter()
+    for v in values:
+        single.merge(v)
+    assert allclose(single.variance, counter.variance)
+    assert allclose(single.nnz, counter.nnz)
+
+    with pytest.raises(ValueError):
+        StatCounter(values, stats='mean').variance
+
+def test_stats(sc):
+
+    x = arange(2*3*4).reshape(2, 3, 4)
+    b = array(x, sc)
+
+    stats = b.stats()
+    assert sorted(stats) == ['max', 'mean', 'min', 'std']
+    assert allclose(stats['mean'], x.mean())
+    assert allclose(stats['std'], x.std())
+    assert stats['min'] == x.min()
+    assert stats['max'] == x.max()
+
+    stats = b.stats(axis=1, stats=('sum', 'var', 'min', 'max', 'count'))
+    assert allclose(stats['sum'], x.sum(axis=1))
+    assert allclose(stats['var'], x.var(axis=1))
+    assert allclose(stats['min'], x.min(axis=1))
+    assert allclose(stats['max'], x.max(axis=1))
+    assert stats['count'] == 3
+
+    stats = b.stats(axis=(0, 1), stats='mean', keepdims=True)
+    assert allclose(stats['mean'], x.mean(axis=(0, 1), keepdims=True))
+
+    with pytest.raises(ValueError):
+        b.stats(stats='median')
+
+def test_reduce_values(sc):
+    from numpy import add, maximum, minimum
+
+    x = arange(2*3*4*5).reshape(2, 3, 4, 5)
+
+    for split in (1, 2, 3):
+        b = array(x, sc, axis=tuple(range(split)))
+        for axis in [(1,), (3,), (0, 2), (1, 3), (0, 1, 3)]:
+            assert allclose(b.reduce(add, axis=axis), add.reduce(x, axis=axis))
+            assert allclose(b.reduce(maximum, axis=axis), maximum.reduce(x, axis=axis))
+            assert allclose(b.sum(axis=axis), x.sum(axis=axis))
+            assert allclose(b.var(axis=axis), x.var(axis=axis))
+
+        assert allclose(b.min(axis=(3, 1), keepdims=True), minimum.reduce(x, axis=(1, 3), keepdims=True))
+        assert allclose(b.std(axis=(3, 1), keepdims=True), x.std(axis=(1, 3), keepdims=True))
+        stats = b.stats(axis=(0, 3), stats=('max', 'std', 'count'))
+        assert allclose(stats['max'], x.max(axis=(0, 3)))
+        assert allclose(stats['std'], x.std(axis=(0, 3)))
+        assert stats['count'] == 10
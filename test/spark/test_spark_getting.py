@@ -82,6 +82,26 @@ def test_getitem_list(sc):
     assert allclose(b[[0, 1], [0, 2], [0, 3]].toarray(), x[[0, 1], [0, 2], [0, 3]])
     assert allclose(b[[0, 1, 2], [0, 2, 1], [0, 3, 1]].toarray(), x[[0, 1, 2], [0, 2, 1], [0, 3, 1]])
 
+    # out of order and repeated targets
+    assert allclose(b[[2, 0, 2], [1, 1, 1], [3, 0, 2]].toarray(), x[[2, 0, 2], [1, 1, 1], [3, 0, 2]])
+    assert allclose(b[[2, 0, 2], [1, 1, 1], [3, 0, 2]].first(), x[2, 1, 3])
+    assert allclose(b[[2, 0, 2]].toarray(), x[[2, 0, 2]])
+    assert allclose(b[[2, 0, 2]].first(), x[2, 0])
+    assert allclose(b[:, [2, 0, 2]].toarray(), x[:, [2, 0, 2]])
+
+    # the broadcast lookups are released by unpersist, and sent again if needed
+    c = b[[2, 0, 2], [1, 1, 1], [3, 0, 2]]
+    assert len(c._broadcasts) == 1
+    c.unpersist()
+    assert allclose(c.toarray(), x[[2, 0, 2], [1, 1, 1], [3, 0, 2]])
+
+    # and kept through a transpose
+    t = b[[2, 0, 2]].T
+    assert t._pending is not None
+    assert len(t._broadcasts) == 1
+    t.unpersist()
+    assert allclose(t.toarray(), x[[2, 0, 2]].T)
+
 def test_getitem_list_array(sc):
 
     x = arange(3*3*4).reshape((3, 3, 4))
@@ -107,6 +127,8 @@ def test_getitem_mixed(sc):
     assert allclose(b[i, s, s, s].toarray(), x[i, s, s, s])
     assert allclose(b[:, :, i, :].toarray(), x[:, :, i, :])
     assert allclose(b[s, s, i, s].toarray(), x[s, s, i, s])
+    assert len(b[i, s, s, s]._broadcasts) == 1
+    assert b[:, :, i, :]._broadcasts is None
 
     i = [1]
     assert allclose(b[i, :, :, :].toarray(), x[i, :, :, :])
@@ -116,6 +138,107 @@ def test_getitem_mixed(sc):
     with pytest.raises(ValueError):
         b[i, :, :, :]
 
+def test_getitem_multiple(sc):
+
+    x = arange(4*5*6*3).reshape(4, 5, 6, 3)
+    i, j = [0, 3, 1], [4, 0, 4]
+    s = slice(1, 3)
+
+    for axis in [(0,), (0, 1), (0, 1, 2)]:
+        b = array(x, sc, axis=axis)
+        # adjacent advanced indices, on keys, values or both
+        assert allclose(b[i, j].toarray(), x[i, j])
+        assert allclose(b[s, i, j].toarray(), x[s, i, j])
+        assert allclose(b[:, :, i, [0, 2, 1]].toarray(), x[:, :, i, [0, 2, 1]])
+        assert allclose(b[:, i, j, :].toarray(), x[:, i, j, :])
+        # broadcast, and separated by slices
+        assert allclose(b[[[0], [2]], :, [[1, 5]]].toarray(), x[[[0], [2]], :, [[1, 5]]])
+        assert allclose(b[i, s, :, [2, 0, 1]].toarray(), x[i, s, :, [2, 0, 1]])
+        # ints among advanced indices
+        assert allclose(b[2, :, i, [2, 0, 2]].toarray(), x[2, :, i, [2, 0, 2]])
+        assert allclose(b[i, 1, j].toarray(), x[i, 1, j])
+        assert b[1, :, [1, 5]].shape == x[1, :, [1, 5]].shape == (2, 5, 3)
+        assert allclose(b[1, :, [1, 5]].toarray(), x[1, :, [1, 5]])
+        assert b[1, 4:5, [1, 5], 2:3].shape == x[1, 4:5, [1, 5], 2:3].shape == (2, 1, 1)
+        assert allclose(b[1, 4:5, [1, 5], 2:3].toarray(), x[1, 4:5, [1, 5], 2:3])
+        assert allclose(b[:, 2, [1, 5]].toarray(), x[:, 2, [1, 5]])
+
+    with pytest.raises(ValueError):
+        b[[0, 1], [0, 1, 2], :]
+
+def test_getitem_mask(sc):
+    from numpy import random, zeros
+
+    x = arange(4*5*6).reshape(4, 5, 6)
+    mask = random.RandomState(0).rand(5, 6) > 0.5
+    rows = x[:, 0, 0] % 60 == 0
+
+    for axis in [(0,), (0, 1)]:
+        b = array(x, sc, axis=axis)
+        assert allclose(b[:, mask].toarray(), x[:, mask])
+        assert allclose(b[rows].toarray(), x[rows])
+        assert allclose(b[rows, 1:4].toarray(), x[rows, 1:4])
+        assert allclose(b[x > 60].toarray(), x[x > 60])
+        assert allclose(b[1:3, mask].toarray(), x[1:3, mask])
+        assert allclose(b[rows, :, arange(6) % 3 == 0].toarray(), x[rows, :, arange(6) % 3 == 0])
+
+        c = b[rows, :, arange(6) % 3 == 0]
+        assert len(c._broadcasts) == 1
+        c.unpersist()
+        assert allclose(c.toarray(), x[rows, :, arange(6) % 3 == 0])
+
+        # the broadcast lookup is kept by arrays transposed from the result
+        t = b[rows, :, arange(6) % 3 == 0].T
+        assert t._pending is not None
+        assert len(t._broadcasts) == 1
+        t.unpersist()
+        assert allclose(t.toarray(), x[rows, :, arange(6) % 3 == 0].T)
+
+    # all-False masks select nothing
+    none = zeros((5, 6), dtype=bool)
+    for axis in [(0,), (0, 1)]:
+        b = array(x, sc, axis=axis)
+        assert b[:, none].shape == x[:, none].shape == (4, 0)
+        assert b[rows & False].shape == x[rows & False].shape == (0, 5, 6)
+        assert b[rows & False, 1:3].toarray().shape == (0, 2, 6)
+        assert b[x < 0].shape == (0,)
+        assert b[rows & False].dtype == x.dtype
+
+    with pytest.raises(ValueError):
+        b[:, mask[:2]]
+
+def test_getitem_pruning(sc):
+    x = arange(8*4*3).reshape((8, 4, 3))
+    b = array(x, sc, axis=(0, 1), npartitions=4)
+
+    # count the records each selection evaluates
+    def counted(arr):
+        seen = sc.accumulator(0)
+        def f(v):
+            seen.add(1)
+            return v
+        return seen, arr.map(f, axis=(0, 1), value_shape=(3,), dtype=x.dtype)
+
+    seen, c = counted(b)
+    assert allclose(c[2:4, 1:3].toarray(), x[2:4, 1:3])
+    assert seen.value == 8
+    seen, c = counted(b)
+    assert allclose(c[[4, 5], [0, 3], [1, 2]].toarray(), x[[4, 5], [0, 3], [1, 2]])
+    assert seen.value == 8
+    seen, c = counted(b)
+    assert allclose(c[[1, 0], :, 1:].toarray(), x[[1, 0], :, 1:])
+    assert seen.value == 8
+    seen, c = counted(b)
+    assert allclose(c[6:1:-2].toarray(), x[6:1:-2])
+    assert seen.value == 24
+
+    # without a partitioner, cached arrays find the range of keys in each partition
+    c = b.keys.transpose(1, 0)
+    assert c._partitioner is None
+    c.cache()
+    assert allclose(c[1:2, 0:2].toarray(), x.transpose(1, 0, 2)[1:2, 0:2])
+    assert c._keyranges == [(0, 25), (2, 27), (4, 29), (6, 31)]
+
 def test_bounds(sc):
 
     x = arange(5)
@@ -245,3 +245,24 @@ def test_reshape(sc):
     new_shape = (6, 4, 10, 12)
     with pytest.raises(NotImplementedError):
         b.reshape(new_shape)
+
+def test_swap_composition(sc):
+
+    a = arange(2*3*4*5).reshape((2, 3, 4, 5))
+    b = array(a, sc, axis=(0, 1))
+
+    # swaps that cancel do not swap
+    assert b.T.T is b
+    assert b.swap((1,), (0,)).swap((1,), (0,)) is b
+
+    # chained swaps and transposes are performed as a single swap
+    c = b.swap((1,), (0,)).transpose(3, 2, 1, 0).swapaxes(0, 1)
+    source, p, _ = c._pending
+    assert source is b
+    assert c.shape == (3, 5, 4, 2)
+    assert allclose(c.toarray(), a.transpose(0, 2, 1, 3).transpose(3, 2, 1, 0).swapaxes(0, 1))
+    assert c._pending is None
+
+    # deferred operations are applied before the swap
+    c = b.map(lambda x: x * 2, axis=(0, 1)).T
+    assert allclose(c.toarray(), (a * 2).T)
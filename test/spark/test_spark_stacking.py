@@ -3,6 +3,7 @@ from numpy import arange, repeat, asarray, vstack, tile
 from bolt import array, ones
 from bolt.utils import allclose
 from bolt.spark.array import BoltArraySpark
+from bolt.spark.stack import StackedArray
 
 
 def _2D_stackable_preamble(sc, num_partitions=2):
@@ -130,4 +131,171 @@ def test_stacked_conversion(sc):
     from pyspark import RDD
     barr = _2D_stackable_preamble(sc)
     k1 = barr.tordd().keys()
-    assert isinstance(k1, RDD)
\ No newline at end of file
+    assert isinstance(k1, RDD)
+
+def test_stacked_keys(sc):
+
+    x = arange(6*4*3).reshape(6, 4, 3)
+    b = array(x, sc, axis=(0, 1), npartitions=3)
+    s = b.stack(size=5)
+
+    keys, values = s.tordd().first()
+    assert keys.shape == (5, 2)
+    assert values.shape == (5, 3)
+    assert s.dtype == x.dtype
+    assert allclose(s.toarray(), x)
+    assert allclose(s.map(lambda v: v * 2).toarray(), x * 2)
+
+def test_stacked_getitem(sc):
+
+    x = arange(6*4*3).reshape(6, 4, 3)
+    b = array(x, sc, axis=(0, 1), npartitions=3)
+    s = b.stack(size=5)
+
+    for index in [(slice(1, 5),), (slice(None), slice(1, 3)), (slice(0, 6, 2), 1),
+                  (slice(5, 0, -2), slice(None), 2), (slice(2, 4), slice(None), slice(0, 2)),
+                  (3,), (-1, slice(1, 4, 2))]:
+        assert allclose(s[index].toarray(), x[index])
+        assert s[index].shape == x[index].shape
+
+    assert allclose(s[2, 3], x[2, 3])
+
+    with pytest.raises(ValueError):
+        s[[0, 1]]
+    with pytest.raises(ValueError):
+        s[10:12]
+
+def test_stacked_reduce(sc):
+
+    from numpy import add
+    x = arange(6*4*3).reshape(6, 4, 3)
+    b = array(x, sc, axis=(0, 1), npartitions=3)
+    s = b.stack(size=5)
+
+    for axis in [(0,), (1,), (2,), (0, 1), (0, 2), (1, 2), (0, 1, 2)]:
+        assert allclose(s.reduce(add, axis=axis), x.sum(axis=axis))
+        assert allclose(s.reduce(lambda a, b: a + b, axis=axis), x.sum(axis=axis))
+        assert allclose(s.max(axis=axis), x.max(axis=axis))
+        assert allclose(s.mean(axis=axis), x.mean(axis=axis))
+        assert allclose(s.std(axis=axis), x.std(axis=axis))
+
+    assert allclose(s.sum(), x.sum())
+    assert allclose(s.sum(axis=1, keepdims=True), x.sum(axis=1, keepdims=True))
+    stats = s.stats(axis=0, stats=('mean', 'var', 'count'))
+    assert allclose(stats['mean'], x.mean(axis=0))
+    assert allclose(stats['var'], x.var(axis=0))
+    assert stats['count'] == 6
+
+def test_stacked_filter(sc):
+
+    x = arange(6*4*3).reshape(6, 4, 3)
+    b = array(x, sc, axis=(0, 1), npartitions=3)
+    s = b.stack(size=5)
+
+    # count the stacks the filter evaluates
+    seen = sc.accumulator(0)
+    def even(v):
+        seen.add(1)
+        return v.sum(axis=1) % 2 == 0
+
+    f = s.filter(even)
+    expected = x.reshape(24, 3)[x.reshape(24, 3).sum(axis=1) % 2 == 0]
+    assert f.shape == expected.shape
+    assert f.split == 1
+    assert allclose(f.toarray(), expected)
+    assert allclose(f.sum(axis=0), expected.sum(axis=0))
+    assert seen.value == s.tordd().count()
+    f.unpersist()
+
+    assert s.filter(lambda v: v[:, 0] < 0).shape == (0,)
+
+def test_stacked_map_keys(sc):
+
+    x = arange(6*4*3).reshape(6, 4, 3)
+    b = array(x, sc, axis=(0, 1), npartitions=3)
+    s = b.stack(size=5)
+
+    m = s.map(lambda kv: kv[1] + kv[0][:, :1], with_keys=True)
+    assert m.shape == x.shape
+    assert allclose(m.toarray(), x + arange(6)[:, None, None])
+
+    m = s.map(lambda v: v.sum(axis=1), value_shape=(), dtype=x.dtype)
+    assert m.shape == (6, 4)
+    assert m.dtype == x.dtype
+    assert allclose(m.toarray(), x.sum(axis=2))
+
+def test_stack_bytes(sc):
+
+    x = arange(40*10, dtype='float64').reshape(40, 10)
+    b = array(x, sc, npartitions=2)
+
+    # each record is 80 bytes
+    s = b.stack(size="400b")
+    assert s.tordd().values().map(len).collect() == [5] * 8
+    assert allclose(s.toarray(), x)
+
+    s = b.stack(size="0.5kb")
+    assert s.tordd().values().first().shape == (6, 10)
+
+    # a record larger than the size is stacked on its own
+    assert b.stack(size="10b").tordd().values().first().shape == (1, 10)
+
+    # small arrays stack whole partitions automatically
+    assert b.stack().tordd().values().first().shape == (20, 10)
+    assert s.stacksize(memory="1mb") == "%db" % (1024 ** 2 // 16)
+    assert s.stacksize(memory="16gb") == "%db" % (16 * 1024 ** 2)
+
+def test_stack_views(sc):
+
+    x = arange(10*4).reshape(10, 4)
+    b = array(x, sc, npartitions=2)
+
+    def check(it):
+        stack = None
+        for k, v in it:
+            if stack is None:
+                stack = v.base
+            yield v.base is not None and v.base is stack
+
+    # unstacked records are views of their stack
+    assert all(b.stack(size=5).unstack().tordd().mapPartitions(check).collect())
+    assert allclose(b.stack(size=3).unstack().toarray(), x)
+    assert b.stack(size=3).tordd().values().map(len).collect() == [3, 2, 3, 2]
+
+def test_blocked(sc):
+
+    x = arange(60*4, dtype='float64').reshape(60, 4)
+    b = array(x, sc, npartitions=3)
+
+    # small values are held in stacks, without changing the results
+    assert b._blocked
+    m = b.map(lambda v: v * 2, value_shape=(4,), dtype=x.dtype).astype('float32')
+    assert m._blocked
+    assert m.dtype == 'float32'
+    assert allclose(m.toarray(), (x * 2).astype('float32'))
+    assert allclose(b.map(lambda kv: kv[1] + kv[0][0], with_keys=True, value_shape=(4,),
+                          dtype=x.dtype).toarray(), x + arange(60)[:, None])
+
+    f = b.filter(lambda v: v[0] % 8 == 0)
+    assert f._blocked
+    assert allclose(f.toarray(), x[x[:, 0] % 8 == 0])
+    f.unpersist()
+
+    g = b[5:40:3, 1:3]
+    assert g._blocked
+    assert allclose(g.toarray(), x[5:40:3, 1:3])
+    assert allclose(b.first(), x[0])
+    assert allclose(b.sum(axis=0).toarray(), x.sum(axis=0))
+    assert allclose(b.reduce(lambda v, w: v + w).toarray(), x.sum(axis=0))
+
+    # other operations, and unstack, split the stacks into records
+    assert b.tordd().keys().first() == (0,)
+    assert allclose(b.swap((0,), (0,)).toarray(), x.T)
+    u = b.stack(size=7).unstack()
+    assert u._blocked
+    assert allclose(u.toarray(), x)
+
+    # large values are held as records
+    big = ones((2, 3, StackedArray.SMALL), sc)
+    assert not big._blocked
+    assert allclose(big.sum(axis=(0, 1)).toarray(), asarray([6.0] * StackedArray.SMALL))
@@ -1,4 +1,4 @@
-from bolt.utils import tupleize, argpack
+from bolt.utils import tupleize, argpack, allclose
 
 
 def test_tupleize():
@@ -13,4 +13,19 @@ def test_argpack():
 
     assert argpack(((1, 2),)) == (1, 2)
     assert argpack((1, 2)) == (1, 2)
-    assert argpack(([0, 1],)) == (0, 1)
\ No newline at end of file
+    assert argpack(([0, 1],)) == (0, 1)
+
+def test_pack():
+
+    from numpy import arange, float32
+    from bolt.spark.utils import pack, unpack
+
+    x = arange(12, dtype=float32).reshape(3, 4)
+    header, value = unpack(pack((1, 2), x[:, ::2]), 2, float32, (3, 2))
+    assert header == (1, 2)
+    assert allclose(value, x[:, ::2])
+    value[0, 0] = 10
+
+    header, value = unpack(pack((5,), x[:0]), 1, float32)
+    assert header == (5,)
+    assert value.shape == (0,)